@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ AddGeohashColumnsAlgorithm
+                                 A QGIS plugin
+ This plugin adds four expression functions to work with geohash
+ Generated by Plugin Builder: http://g-sherman.github.io/Qgis-Plugin-Builder/
+                             -------------------
+        begin                : 2023-12-09
+        git sha              : $Format:%H$
+        copyright            : (C) 2023 by Valentin BUIRA
+        email                : valentin.buira at gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+from qgis.PyQt.QtCore import QCoreApplication, QVariant
+from qgis.core import (QgsCoordinateReferenceSystem,
+                       QgsCoordinateTransform,
+                       QgsField,
+                       QgsProcessingException,
+                       QgsProcessingFeatureBasedAlgorithm,
+                       QgsProcessingParameterString)
+
+from .geohash import encode_multi
+
+
+def parse_precisions(text):
+    """
+    Parse a comma separated list of precisions like '5, 7, 9'.
+    """
+    try:
+        precisions = sorted({int(item) for item in text.split(',') if item.strip()})
+    except ValueError:
+        precisions = []
+    if not precisions or precisions[0] < 1 or precisions[-1] > 12:
+        raise QgsProcessingException('Precisions must be a comma separated list of integers between 1 and 12')
+    return precisions
+
+
+class AddGeohashColumnsAlgorithm(QgsProcessingFeatureBasedAlgorithm):
+    """
+    Add one geohash column per precision to a layer in a single pass.
+    Each feature is encoded once at the finest precision, the other
+    columns are prefixes of it.
+    """
+
+    PRECISIONS = 'PRECISIONS'
+    PREFIX = 'PREFIX'
+
+    precisions = []
+    prefix = 'geohash_'
+
+    def initParameters(self, config=None):
+        self.addParameter(
+            QgsProcessingParameterString(
+                self.PRECISIONS,
+                self.tr('Precisions (comma separated)'),
+                defaultValue='5,7,9'
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterString(
+                self.PREFIX,
+                self.tr('Field name prefix'),
+                defaultValue='geohash_'
+            )
+        )
+
+    def outputName(self):
+        return self.tr('Geohash columns')
+
+    def outputFields(self, input_fields):
+        for precision in self.precisions:
+            input_fields.append(QgsField('{}{}'.format(self.prefix, precision), QVariant.String, len=precision))
+        return input_fields
+
+    def prepareAlgorithm(self, parameters, context, feedback):
+        self.precisions = parse_precisions(self.parameterAsString(parameters, self.PRECISIONS, context))
+        self.prefix = self.parameterAsString(parameters, self.PREFIX, context)
+        source = self.parameterAsSource(parameters, 'INPUT', context)
+        self.transform = QgsCoordinateTransform(source.sourceCrs(),
+                                                QgsCoordinateReferenceSystem('EPSG:4326'),
+                                                context.transformContext())
+        return True
+
+    def processFeature(self, feature, context, feedback):
+        geometry = feature.geometry()
+        if geometry.isNull():
+            feature.setAttributes(feature.attributes() + [None] * len(self.precisions))
+            return [feature]
+        point = self.transform.transform(geometry.centroid().asPoint())
+        geohashes = encode_multi(point.y(), point.x(), self.precisions)
+        feature.setAttributes(feature.attributes() + [geohashes[precision] for precision in self.precisions])
+        return [feature]
+
+    def name(self):
+        return 'addgeohashcolumns'
+
+    def displayName(self):
+        return self.tr('Add geohash columns')
+
+    def group(self):
+        return self.tr('Vector table')
+
+    def groupId(self):
+        return 'vectortable'
+
+    def shortHelpString(self):
+        return self.tr('Adds one geohash column per precision, named with the prefix followed by '
+                       'the precision, in a single pass over the layer. The geohashes are computed '
+                       'from the centroid of the geometries, which is encoded only once at the '
+                       'finest precision.')
+
+    def tr(self, string):
+        return QCoreApplication.translate('Processing', string)
+
+    def createInstance(self):
+        return AddGeohashColumnsAlgorithm()
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ BuildDigestTreeAlgorithm
+                                 A QGIS plugin
+ This plugin adds four expression functions to work with geohash
+ Generated by Plugin Builder: http://g-sherman.github.io/Qgis-Plugin-Builder/
+                             -------------------
+        begin                : 2023-12-09
+        git sha              : $Format:%H$
+        copyright            : (C) 2023 by Valentin BUIRA
+        email                : valentin.buira at gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+from qgis.PyQt.QtCore import QCoreApplication
+from qgis.core import (QgsCoordinateReferenceSystem,
+                       QgsCoordinateTransform,
+                       QgsFeatureRequest,
+                       QgsProcessing,
+                       QgsProcessingAlgorithm,
+                       QgsProcessingOutputNumber,
+                       QgsProcessingParameterFeatureSource,
+                       QgsProcessingParameterField,
+                       QgsProcessingParameterFileDestination,
+                       QgsProcessingParameterNumber)
+
+from .digest_tree import build_tree, new_digest
+from .geohash import encode
+
+
+class BuildDigestTreeAlgorithm(QgsProcessingAlgorithm):
+    """
+    Hash the content of the features of a layer into a digest tree file
+    keyed by the geohash of their centroid, to be compared with the tree
+    of another version of the layer.
+    """
+
+    INPUT = 'INPUT'
+    FIELDS = 'FIELDS'
+    PRECISION = 'PRECISION'
+    OUTPUT = 'OUTPUT'
+    CELL_COUNT = 'CELL_COUNT'
+
+    def initAlgorithm(self, config):
+        self.addParameter(
+            QgsProcessingParameterFeatureSource(
+                self.INPUT,
+                self.tr('Input layer'),
+                [QgsProcessing.TypeVectorAnyGeometry]
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterField(
+                self.FIELDS,
+                self.tr('Fields to hash (all fields if not set)'),
+                parentLayerParameterName=self.INPUT,
+                allowMultiple=True,
+                optional=True
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.PRECISION,
+                self.tr('Leaf cell precision'),
+                QgsProcessingParameterNumber.Integer,
+                defaultValue=6,
+                minValue=1,
+                maxValue=12
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterFileDestination(
+                self.OUTPUT,
+                self.tr('Digest tree'),
+                self.tr('Geohash digest tree (*.ghd)')
+            )
+        )
+
+        self.addOutput(
+            QgsProcessingOutputNumber(
+                self.CELL_COUNT,
+                self.tr('Number of leaf cells')
+            )
+        )
+
+    def processAlgorithm(self, parameters, context, feedback):
+        source = self.parameterAsSource(parameters, self.INPUT, context)
+        fields = self.parameterAsFields(parameters, self.FIELDS, context)
+        precision = self.parameterAsInt(parameters, self.PRECISION, context)
+        path = self.parameterAsFileOutput(parameters, self.OUTPUT, context)
+
+        request = QgsFeatureRequest()
+        if fields:
+            request.setSubsetOfAttributes(fields, source.fields())
+            indexes = [source.fields().lookupField(field) for field in fields]
+        else:
+            indexes = list(range(source.fields().count()))
+        transform = QgsCoordinateTransform(source.sourceCrs(),
+                                           QgsCoordinateReferenceSystem('EPSG:4326'),
+                                           context.transformContext())
+        total = 100.0 / source.featureCount() if source.featureCount() else 0
+        skipped = 0
+
+        def items():
+            nonlocal skipped
+            for current, feature in enumerate(source.getFeatures(request)):
+                if feedback.isCanceled():
+                    return
+                feedback.setProgress(int(current * total))
+                geometry = feature.geometry()
+                if geometry.isNull():
+                    skipped += 1
+                    continue
+                point = transform.transform(geometry.centroid().asPoint())
+                digest = new_digest()
+                attributes = feature.attributes()
+                digest.update(repr([attributes[i] for i in indexes]).encode())
+                digest.update(bytes(geometry.asWkb()))
+                yield encode(point.y(), point.x(), precision=precision), digest.digest()
+
+        # A canceled build leaves the existing tree in place
+        count = build_tree(path, items(), precision, feedback.isCanceled)
+        if count is None:
+            return {}
+        if skipped:
+            feedback.pushInfo(self.tr('{} features without geometry were not hashed').format(skipped))
+        feedback.pushInfo(self.tr('{} leaf cells written').format(count))
+        return {self.OUTPUT: path, self.CELL_COUNT: count}
+
+    def name(self):
+        return 'builddigesttree'
+
+    def displayName(self):
+        return self.tr('Build geohash digest tree')
+
+    def group(self):
+        return self.tr('Vector analysis')
+
+    def groupId(self):
+        return 'vectoranalysis'
+
+    def shortHelpString(self):
+        return self.tr('Hashes the attributes and the geometry of every feature into a tree of '
+                       'digests keyed by the geohash of its centroid: leaf cells of the given '
+                       'precision combine the digests of their features and each parent cell '
+                       'combines its children. The tree is saved to a file so a version of a layer '
+                       'is only hashed once, and two trees are compared with the "Compare geohash '
+                       'digest trees" algorithm. Fields that change between versions without the '
+                       'data changing, like a regenerated fid, should be left out of the hashed '
+                       'fields. Features without geometry are not hashed.')
+
+    def tr(self, string):
+        return QCoreApplication.translate('Processing', string)
+
+    def createInstance(self):
+        return BuildDigestTreeAlgorithm()
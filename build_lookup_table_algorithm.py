@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ BuildLookupTableAlgorithm
+                                 A QGIS plugin
+ This plugin adds four expression functions to work with geohash
+ Generated by Plugin Builder: http://g-sherman.github.io/Qgis-Plugin-Builder/
+                             -------------------
+        begin                : 2023-12-09
+        git sha              : $Format:%H$
+        copyright            : (C) 2023 by Valentin BUIRA
+        email                : valentin.buira at gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+from qgis.PyQt.QtCore import QCoreApplication
+from qgis.core import (NULL,
+                       QgsCoordinateReferenceSystem,
+                       QgsCoordinateTransform,
+                       QgsFeatureRequest,
+                       QgsProcessing,
+                       QgsProcessingAlgorithm,
+                       QgsProcessingOutputNumber,
+                       QgsProcessingParameterFeatureSource,
+                       QgsProcessingParameterField,
+                       QgsProcessingParameterFileDestination,
+                       QgsProcessingParameterNumber)
+
+from .geohash import encode, to_int
+from .lookup_table import build_table
+
+
+class BuildLookupTableAlgorithm(QgsProcessingAlgorithm):
+    """
+    Build a geohash -> value lookup table file, queried with the
+    geohash_lookup expression function.
+    """
+
+    INPUT = 'INPUT'
+    GEOHASH_FIELD = 'GEOHASH_FIELD'
+    VALUE_FIELD = 'VALUE_FIELD'
+    PRECISION = 'PRECISION'
+    OUTPUT = 'OUTPUT'
+    ROW_COUNT = 'ROW_COUNT'
+
+    def initAlgorithm(self, config):
+        self.addParameter(
+            QgsProcessingParameterFeatureSource(
+                self.INPUT,
+                self.tr('Input layer'),
+                [QgsProcessing.TypeVector]
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterField(
+                self.GEOHASH_FIELD,
+                self.tr('Geohash field (the centroid of the geometry is used if not set)'),
+                parentLayerParameterName=self.INPUT,
+                type=QgsProcessingParameterField.String,
+                optional=True
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterField(
+                self.VALUE_FIELD,
+                self.tr('Value field'),
+                parentLayerParameterName=self.INPUT,
+                type=QgsProcessingParameterField.Numeric
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.PRECISION,
+                self.tr('Precision'),
+                QgsProcessingParameterNumber.Integer,
+                defaultValue=8,
+                minValue=1,
+                maxValue=12
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterFileDestination(
+                self.OUTPUT,
+                self.tr('Lookup table'),
+                self.tr('Geohash lookup table (*.ghl)')
+            )
+        )
+
+        self.addOutput(
+            QgsProcessingOutputNumber(
+                self.ROW_COUNT,
+                self.tr('Number of cells')
+            )
+        )
+
+    def processAlgorithm(self, parameters, context, feedback):
+        source = self.parameterAsSource(parameters, self.INPUT, context)
+        geohash_field = self.parameterAsString(parameters, self.GEOHASH_FIELD, context)
+        value_field = self.parameterAsString(parameters, self.VALUE_FIELD, context)
+        precision = self.parameterAsInt(parameters, self.PRECISION, context)
+        path = self.parameterAsFileOutput(parameters, self.OUTPUT, context)
+
+        request = QgsFeatureRequest()
+        attributes = [value_field, geohash_field] if geohash_field else [value_field]
+        request.setSubsetOfAttributes(attributes, source.fields())
+        if geohash_field:
+            request.setFlags(QgsFeatureRequest.NoGeometry)
+        transform = QgsCoordinateTransform(source.sourceCrs(),
+                                           QgsCoordinateReferenceSystem('EPSG:4326'),
+                                           context.transformContext())
+        total = 100.0 / source.featureCount() if source.featureCount() else 0
+        invalid = 0
+
+        def items():
+            nonlocal invalid
+            for current, feature in enumerate(source.getFeatures(request)):
+                if feedback.isCanceled():
+                    return
+                feedback.setProgress(int(current * total))
+                value = feature[value_field]
+                if value is None or value == NULL:
+                    continue
+                if geohash_field:
+                    geohash = feature[geohash_field]
+                    if not isinstance(geohash, str):
+                        continue
+                    geohash = geohash.strip().lower()
+                    try:
+                        to_int(geohash)
+                    except KeyError:
+                        invalid += 1
+                        continue
+                else:
+                    geometry = feature.geometry()
+                    if geometry.isNull():
+                        continue
+                    point = transform.transform(geometry.centroid().asPoint())
+                    geohash = encode(point.y(), point.x(), precision=precision)
+                yield geohash, value
+
+        # A canceled build leaves the existing table in place
+        count = build_table(path, items(), precision, feedback.isCanceled)
+        if count is None:
+            return {}
+        if invalid:
+            feedback.pushInfo(self.tr('{} features have no valid geohash').format(invalid))
+        feedback.pushInfo(self.tr('{} cells written').format(count))
+        return {self.OUTPUT: path, self.ROW_COUNT: count}
+
+    def name(self):
+        return 'buildlookuptable'
+
+    def displayName(self):
+        return self.tr('Build geohash lookup table')
+
+    def group(self):
+        return self.tr('Vector table')
+
+    def groupId(self):
+        return 'vectortable'
+
+    def shortHelpString(self):
+        return self.tr('Builds a compact geohash -> value lookup table file from a numeric field, '
+                       'keyed by a geohash field or by the geohash of the centroid of the '
+                       'geometries. The table is queried with the geohash_lookup expression '
+                       'function, which maps the file in memory instead of loading it. When a cell '
+                       'appears several times the value of its last feature is kept.')
+
+    def tr(self, string):
+        return QCoreApplication.translate('Processing', string)
+
+    def createInstance(self):
+        return BuildLookupTableAlgorithm()
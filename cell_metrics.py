@@ -0,0 +1,126 @@
+"""
+Geodesic metrics of geohash cells on the WGS84 ellipsoid.
+
+The area and the dimensions of a cell only depend on its precision and
+on its row in the grid (its latitude band), so they are computed in
+closed form per row and kept in tables built lazily per precision.
+Precisions with more rows than _max_table_rows are computed on demand
+and memoized instead.
+
+Compared with the ellipsoidal measures of QgsDistanceArea on the cell
+polygon, areas are within 0.1 % and heights within 1 mm for precisions
+3 and finer, widths within 1 mm for precisions 5 and finer. The edges
+of a cell follow parallels while QgsDistanceArea joins its corners with
+geodesics, which only matters for the coarsest cells.
+"""
+from array import array
+from functools import lru_cache
+from math import radians, sin, cos, log, sqrt
+
+from .geohash import grid_position, grid_size
+
+_a = 6378137.0
+_f = 1 / 298.257223563
+_e2 = _f * (2 - _f)
+_e = sqrt(_e2)
+_b2 = _a * _a * (1 - _e2)
+
+# Coefficients of the meridian arc length series
+_m0 = 1 + 3 / 4 * _e2 + 45 / 64 * _e2 ** 2 + 175 / 256 * _e2 ** 3
+_m2 = 3 / 4 * _e2 + 15 / 16 * _e2 ** 2 + 525 / 512 * _e2 ** 3
+_m4 = 15 / 64 * _e2 ** 2 + 105 / 256 * _e2 ** 3
+_m6 = 35 / 512 * _e2 ** 3
+
+_max_table_rows = 1 << 15
+
+# Tables of precision -> (areas, widths, heights) indexed by row
+_tables = {}
+
+
+def _zone_area(latitude):
+    """
+    Area in square meters per radian of longitude between the equator
+    and the latitude.
+    """
+    s = sin(radians(latitude))
+    return _b2 * (s / (2 * (1 - _e2 * s * s)) + log((1 + _e * s) / (1 - _e * s)) / (4 * _e))
+
+def _meridian_arc(latitude):
+    """
+    Length in meters of the meridian between the equator and the latitude.
+    """
+    phi = radians(latitude)
+    return _a * (1 - _e2) * (_m0 * phi - _m2 / 2 * sin(2 * phi) + _m4 / 4 * sin(4 * phi) - _m6 / 6 * sin(6 * phi))
+
+def _parallel_radius(latitude):
+    s = sin(radians(latitude))
+    return _a * cos(radians(latitude)) / sqrt(1 - _e2 * s * s)
+
+@lru_cache(maxsize=65536)
+def _row_metrics(precision, row):
+    """
+    Return the area, width and height of the cells of a row. The width
+    is measured along the parallel at the middle of the row.
+    """
+    rows, cols = grid_size(precision)
+    lat_min = -90.0 + 180.0 * row / rows
+    lat_max = -90.0 + 180.0 * (row + 1) / rows
+    d_lon = radians(360.0 / cols)
+    area = d_lon * (_zone_area(lat_max) - _zone_area(lat_min))
+    width = d_lon * _parallel_radius((lat_min + lat_max) / 2)
+    height = _meridian_arc(lat_max) - _meridian_arc(lat_min)
+    return area, width, height
+
+def _table(precision):
+    table = _tables.get(precision)
+    if table is None:
+        rows, cols = grid_size(precision)
+        areas, widths, heights = array('d'), array('d'), array('d')
+        for row in range(rows):
+            area, width, height = _row_metrics.__wrapped__(precision, row)
+            areas.append(area)
+            widths.append(width)
+            heights.append(height)
+        table = _tables[precision] = (areas, widths, heights)
+    return table
+
+def row_metrics(precision, row):
+    """
+    Return the area in square meters, and the width and height in meters
+    of the cells of a row of the grid of the given precision.
+    """
+    if grid_size(precision)[0] > _max_table_rows:
+        return _row_metrics(precision, row)
+    areas, widths, heights = _table(precision)
+    return areas[row], widths[row], heights[row]
+
+def cell_area(geohash):
+    """
+    Return the area of the geohash cell in square meters.
+    """
+    row, col = grid_position(geohash)
+    return row_metrics(len(geohash), row)[0]
+
+def cell_dimensions(geohash):
+    """
+    Return the width and the height of the geohash cell in meters. The
+    width is measured along the parallel at the middle of the cell.
+    """
+    row, col = grid_position(geohash)
+    area, width, height = row_metrics(len(geohash), row)
+    return width, height
+
+def precision_for_distance(distance, latitude=0.0):
+    """
+    Return the finest precision whose cells at the given latitude are at
+    least distance meters wide and high. Returns 1 if even the coarsest
+    cells are too small.
+    """
+    latitude = min(max(latitude, -90.0), 90.0)
+    for precision in range(12, 0, -1):
+        rows, cols = grid_size(precision)
+        row = min(int((latitude + 90.0) / 180.0 * rows), rows - 1)
+        area, width, height = row_metrics(precision, row)
+        if width >= distance and height >= distance:
+            return precision
+    return 1
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ CompareDigestTreesAlgorithm
+                                 A QGIS plugin
+ This plugin adds four expression functions to work with geohash
+ Generated by Plugin Builder: http://g-sherman.github.io/Qgis-Plugin-Builder/
+                             -------------------
+        begin                : 2023-12-09
+        git sha              : $Format:%H$
+        copyright            : (C) 2023 by Valentin BUIRA
+        email                : valentin.buira at gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+from qgis.PyQt.QtCore import QCoreApplication, QVariant
+from qgis.core import (QgsCoordinateReferenceSystem,
+                       QgsFeature,
+                       QgsFeatureSink,
+                       QgsField,
+                       QgsFields,
+                       QgsGeometry,
+                       QgsProcessingAlgorithm,
+                       QgsProcessingException,
+                       QgsProcessingOutputNumber,
+                       QgsProcessingParameterFeatureSink,
+                       QgsProcessingParameterFile,
+                       QgsRectangle,
+                       QgsWkbTypes)
+
+from .digest_tree import DigestTree, compare_trees
+from .geohash import decode_extent
+
+
+class CompareDigestTreesAlgorithm(QgsProcessingAlgorithm):
+    """
+    Compare the digest trees of two versions of a layer and output the
+    cells whose content changed.
+    """
+
+    OLD = 'OLD'
+    NEW = 'NEW'
+    OUTPUT = 'OUTPUT'
+    CHANGED_COUNT = 'CHANGED_COUNT'
+
+    def initAlgorithm(self, config):
+        self.addParameter(
+            QgsProcessingParameterFile(
+                self.OLD,
+                self.tr('Digest tree of the old version'),
+                extension='ghd'
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterFile(
+                self.NEW,
+                self.tr('Digest tree of the new version'),
+                extension='ghd'
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterFeatureSink(
+                self.OUTPUT,
+                self.tr('Changed cells')
+            )
+        )
+
+        self.addOutput(
+            QgsProcessingOutputNumber(
+                self.CHANGED_COUNT,
+                self.tr('Number of changed cells')
+            )
+        )
+
+    def processAlgorithm(self, parameters, context, feedback):
+        try:
+            old = DigestTree(self.parameterAsFile(parameters, self.OLD, context))
+            new = DigestTree(self.parameterAsFile(parameters, self.NEW, context))
+        except (OSError, ValueError) as e:
+            raise QgsProcessingException(str(e))
+        if old.precision != new.precision:
+            raise QgsProcessingException(self.tr('The digest trees have different precisions ({} and {})')
+                                         .format(old.precision, new.precision))
+
+        fields = QgsFields()
+        fields.append(QgsField('geohash', QVariant.String))
+        fields.append(QgsField('change', QVariant.String))
+        (sink, dest_id) = self.parameterAsSink(parameters, self.OUTPUT, context, fields,
+                                               QgsWkbTypes.Polygon,
+                                               QgsCoordinateReferenceSystem('EPSG:4326'))
+
+        count = 0
+        try:
+            for geohash, change in compare_trees(old, new):
+                if feedback.isCanceled():
+                    return {}
+                lat_min, lat_max, lon_min, lon_max = decode_extent(geohash)
+                feature = QgsFeature(fields)
+                feature.setGeometry(QgsGeometry.fromRect(QgsRectangle(lon_min, lat_min, lon_max, lat_max)))
+                feature.setAttributes([geohash, change])
+                sink.addFeature(feature, QgsFeatureSink.FastInsert)
+                count += 1
+        finally:
+            old.close()
+            new.close()
+
+        feedback.pushInfo(self.tr('{} changed cells').format(count))
+        return {self.OUTPUT: dest_id, self.CHANGED_COUNT: count}
+
+    def name(self):
+        return 'comparedigesttrees'
+
+    def displayName(self):
+        return self.tr('Compare geohash digest trees')
+
+    def group(self):
+        return self.tr('Vector analysis')
+
+    def groupId(self):
+        return 'vectoranalysis'
+
+    def shortHelpString(self):
+        return self.tr('Compares the digest trees of two versions of a layer, built with the "Build '
+                       'geohash digest tree" algorithm at the same precision, and outputs the '
+                       'polygons of the leaf cells whose content changed, with the change: added, '
+                       'removed or modified. Only the prefixes whose digests differ are visited, so '
+                       'the comparison time depends on the number of changes, not on the size of '
+                       'the layers.')
+
+    def tr(self, string):
+        return QCoreApplication.translate('Processing', string)
+
+    def createInstance(self):
+        return CompareDigestTreesAlgorithm()
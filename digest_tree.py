@@ -0,0 +1,183 @@
+"""
+Trees of content digests keyed by geohash prefix, to find the areas
+that changed between two versions of a layer without comparing their
+features one by one.
+
+The digest of a leaf cell is the sum, modulo 2^128, of the 128 bits
+digests of the features in the cell, so the features can be added in
+any order. The digest of a parent cell hashes the keys and the digests
+of its children. Two trees are compared from the top, descending only
+into the prefixes whose digests differ.
+
+A tree file holds a fixed size header followed by one section per
+precision, from 1 to the leaf precision. A section holds the number of
+cells, their sorted integer keys (see geohash.to_int) as unsigned 64
+bits integers, then their 16 bytes digests:
+
+    magic 'GHDT' | version u16 | precision u8 | byte order u8
+    count u64 | keys u64 * count | digests 16 bytes * count   (per precision)
+
+Like the lookup tables, tree files are mapped in memory and searched
+with binary searches, nothing is loaded up front.
+"""
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from hashlib import blake2b
+
+from .geohash import to_int, from_int
+from .lookup_table import replace_atomically
+
+_magic = b'GHDT'
+_version = 1
+_header = struct.Struct('<4sHBB')
+_count = struct.Struct('<Q')
+_byte_orders = {'little': 0, 'big': 1}
+_digest_size = 16
+_mask = (1 << 8 * _digest_size) - 1
+
+
+def new_digest():
+    """
+    Return a new hash object producing digests of the size used in the
+    trees.
+    """
+    return blake2b(digest_size=_digest_size)
+
+def build_tree(path, items, precision, is_canceled=None):
+    """
+    Write a digest tree from an iterable of (geohash, digest), one per
+    feature. Geohashes longer than precision are truncated, shorter ones
+    are skipped. Returns the number of leaf cells written, or None when
+    is_canceled returns true, in which case path is left untouched.
+
+    Like a lookup table, the tree is written to a temporary file renamed
+    over path, processes that have the previous tree mapped keep reading
+    it safely.
+    """
+    leaves = {}
+    for geohash, digest in items:
+        if len(geohash) < precision:
+            continue
+        key = to_int(geohash[:precision])
+        leaves[key] = (leaves.get(key, 0) + int.from_bytes(digest, 'little')) & _mask
+    if is_canceled is not None and is_canceled():
+        return None
+
+    digests = {key: value.to_bytes(_digest_size, 'little') for key, value in leaves.items()}
+    levels = []
+    for level in range(precision, 0, -1):
+        keys = array('Q', sorted(digests))
+        levels.append((keys, b''.join(digests[key] for key in keys)))
+        if level == 1:
+            break
+        parents = {}
+        for key in keys:
+            parent = parents.get(key >> 5)
+            if parent is None:
+                parent = parents[key >> 5] = new_digest()
+            parent.update(bytes((key & 31,)))
+            parent.update(digests[key])
+        digests = {key: parent.digest() for key, parent in parents.items()}
+
+    with replace_atomically(path) as f:
+        f.write(_header.pack(_magic, _version, precision, _byte_orders[sys.byteorder]))
+        for keys, level_digests in reversed(levels):
+            f.write(_count.pack(len(keys)))
+            keys.tofile(f)
+            f.write(level_digests)
+    return len(leaves)
+
+
+class DigestTree:
+    """
+    A digest tree file mapped in memory.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            header = f.read(_header.size)
+            if len(header) < _header.size:
+                raise ValueError('{} is not a geohash digest tree'.format(path))
+            magic, version, self.precision, byte_order = _header.unpack(header)
+            if magic != _magic or version != _version:
+                raise ValueError('{} is not a geohash digest tree'.format(path))
+            if byte_order != _byte_orders[sys.byteorder]:
+                raise ValueError('{} was built on a platform with another byte order'.format(path))
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        data = memoryview(self._mmap)
+        # Levels indexed by precision, as (keys, digests)
+        self._levels = [None]
+        offset = _header.size
+        for precision in range(1, self.precision + 1):
+            count, = _count.unpack_from(self._mmap, offset)
+            offset += _count.size
+            keys = data[offset:offset + 8 * count].cast('Q')
+            offset += 8 * count
+            digests = data[offset:offset + _digest_size * count]
+            offset += _digest_size * count
+            self._levels.append((keys, digests))
+
+    def digest(self, precision, key):
+        """
+        Return the digest of the cell of the given precision and integer
+        key, or None if the cell holds no feature.
+        """
+        keys, digests = self._levels[precision]
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            return digests[_digest_size * i:_digest_size * (i + 1)].tobytes()
+        return None
+
+    def children(self, precision, key):
+        """
+        Return the integer keys of the non empty children of a cell.
+        """
+        keys, digests = self._levels[precision + 1]
+        start = bisect_left(keys, key << 5)
+        end = bisect_left(keys, (key + 1) << 5, start)
+        return keys[start:end].tolist()
+
+    def roots(self):
+        """
+        Return the integer keys of the non empty cells of precision 1.
+        """
+        return self._levels[1][0].tolist()
+
+    def close(self):
+        for keys, digests in self._levels[1:]:
+            keys.release()
+            digests.release()
+        self._mmap.close()
+
+
+def compare_trees(old, new):
+    """
+    Yield the (geohash, change) of the leaf cells whose content differs
+    between two digest trees, in geohash order. change is 'added',
+    'removed' or 'modified'.
+    """
+    if old.precision != new.precision:
+        raise ValueError('The digest trees have different precisions ({} and {})'.format(old.precision, new.precision))
+
+    stack = [(1, key) for key in sorted(set(old.roots()) | set(new.roots()), reverse=True)]
+    while stack:
+        precision, key = stack.pop()
+        old_digest = old.digest(precision, key)
+        new_digest = new.digest(precision, key)
+        if old_digest == new_digest:
+            continue
+        if precision == old.precision:
+            if old_digest is None:
+                change = 'added'
+            elif new_digest is None:
+                change = 'removed'
+            else:
+                change = 'modified'
+            yield from_int(key, precision), change
+            continue
+        children = set(old.children(precision, key)) | set(new.children(precision, key))
+        stack.extend((precision + 1, child) for child in sorted(children, reverse=True))
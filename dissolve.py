@@ -0,0 +1,221 @@
+"""
+Dissolve of geohash cell sets into polygons by grid topology.
+
+Cells are brought to the finest precision of the set, a cell of a
+coarser precision becoming the rectangle of its children. The boundary
+of every cell is made of edges of that grid, oriented with the cell on
+their left: each side is one edge, split only at the corners of the
+other cells lying on it, so a coarse cell costs no more than a fine one.
+An edge shared by two cells appears once in each direction and cancels
+out, the remaining edges are the boundary of the union and are traced
+into rings:
+
+- counter-clockwise rings are exteriors and clockwise rings are holes,
+- at a vertex where cells only touch by their corners, the tracing
+  turns left first and a ring coming back on one of its own vertices is
+  split there, so that no ring touches itself and the polygons are
+  valid.
+
+No geometry library is involved, everything is done on integer grid
+coordinates.
+"""
+from bisect import bisect_left, bisect_right
+from math import sqrt
+
+from .geohash import _grid_bits, grid_position, cell_size
+
+
+def _cell_rectangles(geohashes):
+    """
+    Return the precision of the finest cell and the rectangles
+    (row min, col min, row max, col max), max excluded, of the cells in
+    the grid of that precision. Cells inside another cell of the set
+    are dropped.
+    """
+    cells = set(geohashes)
+    cells = [cell for cell in cells
+             if cell and not any(cell[:i] in cells for i in range(1, len(cell)))]
+    if not cells:
+        return 0, []
+    precision = max(len(cell) for cell in cells)
+    lat_bits, lon_bits = _grid_bits(precision)
+    rectangles = []
+    for cell in cells:
+        row, col = grid_position(cell)
+        cell_lat_bits, cell_lon_bits = _grid_bits(len(cell))
+        d_lat, d_lon = lat_bits - cell_lat_bits, lon_bits - cell_lon_bits
+        rectangles.append((row << d_lat, col << d_lon, (row + 1) << d_lat, (col + 1) << d_lon))
+    return precision, rectangles
+
+def _direction(a, b):
+    """
+    Return the unit direction of the axis aligned edge from a to b.
+    """
+    return (b[0] > a[0]) - (b[0] < a[0]), (b[1] > a[1]) - (b[1] < a[1])
+
+def _boundary_edges(rectangles):
+    """
+    Return the outgoing edges of the boundary of the union of the
+    rectangles, as a dict vertex -> list of next vertices. Vertices
+    are (x, y) = (col, row).
+    """
+    # Sides of the rectangles by row and by column, as (start, end)
+    rows, cols = {}, {}
+    for r0, c0, r1, c1 in rectangles:
+        rows.setdefault(r0, []).append((c0, c1))
+        cols.setdefault(c1, []).append((r0, r1))
+        rows.setdefault(r1, []).append((c1, c0))
+        cols.setdefault(c0, []).append((r1, r0))
+
+    edges = set()
+
+    def add(a, b):
+        if (b, a) in edges:
+            edges.remove((b, a))
+        else:
+            edges.add((a, b))
+
+    # The cells do not overlap, a side is only split at the corners of
+    # the cells touching it, and the shared parts of two sides are split
+    # the same way on both
+    for lines, vertex in ((rows, lambda line, p: (p, line)), (cols, lambda line, p: (line, p))):
+        for line, sides in lines.items():
+            corners = sorted({p for side in sides for p in side})
+            for start, end in sides:
+                points = corners[bisect_left(corners, min(start, end)):bisect_right(corners, max(start, end))]
+                if start > end:
+                    points.reverse()
+                for a, b in zip(points, points[1:]):
+                    add(vertex(line, a), vertex(line, b))
+
+    outgoing = {}
+    for a, b in edges:
+        outgoing.setdefault(a, []).append(b)
+    return outgoing
+
+def _next_vertex(vertex, direction, nexts):
+    """
+    Pop the next vertex of a ring, turning left first, then straight
+    ahead, then right.
+    """
+    if direction is not None and len(nexts) > 1:
+        dx, dy = direction
+        for turn in ((-dy, dx), (dx, dy), (dy, -dx)):
+            for candidate in nexts:
+                if _direction(vertex, candidate) == turn:
+                    nexts.remove(candidate)
+                    return candidate
+    return nexts.pop()
+
+def _trace_rings(outgoing):
+    """
+    Trace the edges into closed rings that never touch themselves.
+    """
+    rings = []
+    for start in list(outgoing):
+        while start in outgoing:
+            path = [start]
+            index = {start: 0}
+            direction = None
+            while path:
+                vertex = path[-1]
+                nexts = outgoing.get(vertex)
+                if not nexts:
+                    break
+                following = _next_vertex(vertex, direction, nexts)
+                if not nexts:
+                    del outgoing[vertex]
+                direction = _direction(vertex, following)
+                if following in index:
+                    position = index[following]
+                    rings.append(path[position:] + [following])
+                    for dropped in path[position + 1:]:
+                        del index[dropped]
+                    del path[position + 1:]
+                    if len(path) == 1 and following not in outgoing:
+                        break
+                else:
+                    index[following] = len(path)
+                    path.append(following)
+    return rings
+
+def _simplify(ring):
+    """
+    Remove the vertices of a closed ring where it goes straight on.
+    """
+    points = ring[:-1]
+    kept = []
+    for i, point in enumerate(points):
+        before, after = points[i - 1], points[(i + 1) % len(points)]
+        if _direction(before, point) != _direction(point, after):
+            kept.append(point)
+    return kept + kept[:1]
+
+def _signed_area(ring):
+    return sum(a[0] * b[1] - b[0] * a[1] for a, b in zip(ring, ring[1:])) / 2
+
+def _contains(ring, x, y):
+    inside = False
+    for (x0, y0), (x1, y1) in zip(ring, ring[1:]):
+        if (y0 > y) != (y1 > y) and x < x0 + (y - y0) * (x1 - x0) / (y1 - y0):
+            inside = not inside
+    return inside
+
+def dissolve_grid(geohashes):
+    """
+    Dissolve geohash cells into polygons in grid coordinates. Returns the
+    precision of the grid and a list of polygons, each one a list of
+    closed rings of (col, row) vertices: a counter-clockwise exterior
+    ring followed by its clockwise holes.
+    """
+    precision, rectangles = _cell_rectangles(geohashes)
+    rings = [_simplify(ring) for ring in _trace_rings(_boundary_edges(rectangles))]
+
+    shells, holes = [], []
+    for ring in rings:
+        area = _signed_area(ring)
+        if area > 0:
+            xs, ys = [p[0] for p in ring], [p[1] for p in ring]
+            shells.append((area, (min(xs), min(ys), max(xs), max(ys)), ring, []))
+        else:
+            holes.append(ring)
+
+    # The smallest shell around a hole is the one it belongs to. The
+    # shells are indexed by a coarse grid of buckets over their bounds.
+    shells.sort(key=lambda shell: shell[0])
+    if holes:
+        x_origin = min(shell[1][0] for shell in shells)
+        y_origin = min(shell[1][1] for shell in shells)
+        span = max(max(shell[1][2] - x_origin, shell[1][3] - y_origin) for shell in shells)
+        bucket_size = max(1, span // max(1, int(sqrt(len(shells)))) + 1)
+        buckets = {}
+        for shell in shells:
+            x_min, y_min, x_max, y_max = shell[1]
+            for i in range((x_min - x_origin) // bucket_size, (x_max - x_origin) // bucket_size + 1):
+                for j in range((y_min - y_origin) // bucket_size, (y_max - y_origin) // bucket_size + 1):
+                    buckets.setdefault((i, j), []).append(shell)
+
+        for hole in holes:
+            (x0, y0), (x1, y1) = hole[0], hole[1]
+            x, y = (x0 + x1) / 2, (y0 + y1) / 2
+            bucket = (int((x - x_origin) // bucket_size), int((y - y_origin) // bucket_size))
+            for area, (x_min, y_min, x_max, y_max), shell, shell_holes in buckets.get(bucket, ()):
+                if x_min <= x <= x_max and y_min <= y <= y_max and _contains(shell, x, y):
+                    shell_holes.append(hole)
+                    break
+
+    return precision, [[shell] + shell_holes for area, bbox, shell, shell_holes in shells]
+
+def dissolve(geohashes):
+    """
+    Dissolve geohash cells, possibly of mixed precisions, into polygons.
+    Returns a list of polygons, each one a list of closed rings of
+    (longitude, latitude): a counter-clockwise exterior ring followed by
+    its clockwise holes.
+    """
+    precision, polygons = dissolve_grid(geohashes)
+    if not polygons:
+        return []
+    height, width = cell_size(precision)
+    return [[[(-180.0 + x * width, -90.0 + y * height) for x, y in ring] for ring in polygon]
+            for polygon in polygons]
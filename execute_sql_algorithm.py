@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ ExecuteSqlAlgorithm
+                                 A QGIS plugin
+ This plugin adds four expression functions to work with geohash
+ Generated by Plugin Builder: http://g-sherman.github.io/Qgis-Plugin-Builder/
+                             -------------------
+        begin                : 2023-12-09
+        git sha              : $Format:%H$
+        copyright            : (C) 2023 by Valentin BUIRA
+        email                : valentin.buira at gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import sqlite3
+from urllib.request import pathname2url
+
+from qgis.PyQt.QtCore import QCoreApplication, QVariant
+from qgis.core import (QgsCoordinateReferenceSystem,
+                       QgsFeature,
+                       QgsFeatureSink,
+                       QgsField,
+                       QgsFields,
+                       QgsGeometry,
+                       QgsProcessingAlgorithm,
+                       QgsProcessingException,
+                       QgsProcessingParameterFeatureSink,
+                       QgsProcessingParameterFile,
+                       QgsProcessingParameterString,
+                       QgsWkbTypes)
+
+from .sqlite_functions import register_functions
+
+_field_types = {int: QVariant.LongLong, float: QVariant.Double, str: QVariant.String}
+
+
+class ExecuteSqlAlgorithm(QgsProcessingAlgorithm):
+    """
+    Run a SQL query on a GeoPackage or SQLite database with the geohash
+    SQL functions registered, and output its result as a layer.
+    """
+
+    DATABASE = 'DATABASE'
+    SQL = 'SQL'
+    GEOMETRY_COLUMN = 'GEOMETRY_COLUMN'
+    OUTPUT = 'OUTPUT'
+
+    BATCH_SIZE = 10000
+
+    def initAlgorithm(self, config):
+        self.addParameter(
+            QgsProcessingParameterFile(
+                self.DATABASE,
+                self.tr('GeoPackage or SQLite database'),
+                fileFilter=self.tr('SQLite databases (*.gpkg *.sqlite *.db)')
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterString(
+                self.SQL,
+                self.tr('SQL query'),
+                multiLine=True
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterString(
+                self.GEOMETRY_COLUMN,
+                self.tr('Column of WKT geometries in EPSG:4326'),
+                optional=True
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterFeatureSink(
+                self.OUTPUT,
+                self.tr('Query result')
+            )
+        )
+
+    def processAlgorithm(self, parameters, context, feedback):
+        path = self.parameterAsFile(parameters, self.DATABASE, context)
+        sql = self.parameterAsString(parameters, self.SQL, context)
+        geometry_column = self.parameterAsString(parameters, self.GEOMETRY_COLUMN, context)
+
+        # Read only, the GeoPackage triggers need SpatiaLite functions to write
+        connection = sqlite3.connect('file:{}?mode=ro'.format(pathname2url(path)), uri=True)
+        try:
+            register_functions(connection)
+            try:
+                cursor = connection.execute(sql)
+            except sqlite3.Error as e:
+                raise QgsProcessingException(self.tr('SQL error: {}').format(e))
+            if cursor.description is None:
+                raise QgsProcessingException(self.tr('The query returns no columns'))
+
+            names = [column[0] for column in cursor.description]
+            if geometry_column and geometry_column not in names:
+                raise QgsProcessingException(self.tr('The query has no {} column').format(geometry_column))
+            geometry_index = names.index(geometry_column) if geometry_column else None
+
+            # Field types are guessed from the first batch of rows
+            rows = cursor.fetchmany(self.BATCH_SIZE)
+            fields = QgsFields()
+            indexes = []
+            for i, name in enumerate(names):
+                if i == geometry_index:
+                    continue
+                values = [row[i] for row in rows if row[i] is not None]
+                field_type = _field_types.get(type(values[0]), QVariant.String) if values else QVariant.String
+                if field_type == QVariant.LongLong and any(isinstance(value, float) for value in values):
+                    field_type = QVariant.Double
+                fields.append(QgsField(name, field_type))
+                indexes.append(i)
+
+            geometry_type = QgsWkbTypes.NoGeometry
+            if geometry_index is not None:
+                wkts = [row[geometry_index] for row in rows if row[geometry_index]]
+                geometry_type = QgsGeometry.fromWkt(wkts[0]).wkbType() if wkts else QgsWkbTypes.Polygon
+            (sink, dest_id) = self.parameterAsSink(parameters, self.OUTPUT, context, fields, geometry_type,
+                                                   QgsCoordinateReferenceSystem('EPSG:4326'))
+
+            count = 0
+            while rows:
+                for row in rows:
+                    feature = QgsFeature(fields)
+                    feature.setAttributes([row[i] for i in indexes])
+                    if geometry_index is not None and row[geometry_index]:
+                        feature.setGeometry(QgsGeometry.fromWkt(row[geometry_index]))
+                    sink.addFeature(feature, QgsFeatureSink.FastInsert)
+                count += len(rows)
+                if feedback.isCanceled():
+                    return {}
+                feedback.pushInfo(self.tr('{} rows').format(count))
+                rows = cursor.fetchmany(self.BATCH_SIZE)
+        finally:
+            connection.close()
+
+        return {self.OUTPUT: dest_id}
+
+    def name(self):
+        return 'executesql'
+
+    def displayName(self):
+        return self.tr('Execute SQL with geohash functions')
+
+    def group(self):
+        return self.tr('Vector general')
+
+    def groupId(self):
+        return 'vectorgeneral'
+
+    def shortHelpString(self):
+        return self.tr('Runs a SQL query on a GeoPackage or SQLite database, opened read only, with '
+                       'geohash functions available in SQL, and outputs the result as a layer. '
+                       'Grouping and filtering by geohash then run inside SQLite instead of row by '
+                       'row in the expression engine. Functions: geohash_encode(lat, lon[, '
+                       'precision]), geohash_from_gpkg(geom[, precision]) for layers in EPSG:4326, '
+                       'geohash_lat(geohash), geohash_lon(geohash), geohash_bbox(geohash) as WKT, '
+                       'geohash_parent(geohash, precision), geohash_neighbours(geohash) as a JSON '
+                       'array for json_each, geohash_to_int(geohash). The column of WKT geometries, '
+                       'for example geohash_bbox(gh) AS wkt, becomes the geometry of the output.')
+
+    def tr(self, string):
+        return QCoreApplication.translate('Processing', string)
+
+    def createInstance(self):
+        return ExecuteSqlAlgorithm()
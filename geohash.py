@@ -18,7 +18,7 @@ You should have received a copy of the GNU Affero General Public
 License along with Geohash.  If not, see
 <http://www.gnu.org/licenses/>.
 """
-from math import log10
+from math import log10, cos, radians, degrees, sin, asin, sqrt, ceil
 
 #  Note: the alphabet in geohash differs from the common base32
 #  alphabet described in IETF's RFC 4648
@@ -179,3 +179,297 @@ def neighbours_dict(geohash):
 
     return dict(zip(cardinal_dir, all_neighbours))
 
+
+# Mean earth radius in meters, used for great circle distances
+_earth_radius = 6371008.8
+
+def _grid_bits(precision):
+    """
+    Return the number of latitude and longitude bits of a geohash of
+    the given precision.
+    """
+    return 5 * precision // 2, (5 * precision + 1) // 2
+
+def grid_size(precision):
+    """
+    Return the number of rows and columns of the grid of geohashes of
+    the given precision.
+    """
+    lat_bits, lon_bits = _grid_bits(precision)
+    return 1 << lat_bits, 1 << lon_bits
+
+def cell_size(precision):
+    """
+    Return the height and the width in degrees of a geohash cell of the
+    given precision.
+    """
+    rows, cols = grid_size(precision)
+    return 180.0 / rows, 360.0 / cols
+
+def _char_bits(cd, starts_with_lon):
+    """
+    Split the 5 bits of a geohash character into its latitude and
+    longitude bits.
+    """
+    lat = lon = 0
+    is_lon = starts_with_lon
+    for mask in [16, 8, 4, 2, 1]:
+        if is_lon:
+            lon = (lon << 1) | bool(cd & mask)
+        else:
+            lat = (lat << 1) | bool(cd & mask)
+        is_lon = not is_lon
+    return lat, lon
+
+# Latitude and longitude bits of each character, characters at even
+# positions start with a longitude bit, at odd positions with a latitude bit
+_even_char_bits = {c: _char_bits(cd, True) for c, cd in __decodemap.items()}
+_odd_char_bits = {c: _char_bits(cd, False) for c, cd in __decodemap.items()}
+
+def grid_position(geohash):
+    """
+    Return the row and column of the geohash in the grid of its
+    precision. Row 0 is the southernmost row and column 0 the
+    westernmost column.
+    """
+    row = col = 0
+    for i, c in enumerate(geohash):
+        if i % 2 == 0:
+            lat, lon = _even_char_bits[c]
+            row, col = (row << 2) | lat, (col << 3) | lon
+        else:
+            lat, lon = _odd_char_bits[c]
+            row, col = (row << 3) | lat, (col << 2) | lon
+    return row, col
+
+def from_grid_position(row, col, precision):
+    """
+    Return the geohash at the given row and column of the grid of the
+    given precision. Inverse of grid_position.
+    """
+    lat_bits, lon_bits = _grid_bits(precision)
+    geohash = []
+    ch = 0
+    for i in range(5 * precision):
+        if i % 2 == 0:
+            lon_bits -= 1
+            ch = (ch << 1) | ((col >> lon_bits) & 1)
+        else:
+            lat_bits -= 1
+            ch = (ch << 1) | ((row >> lat_bits) & 1)
+        if i % 5 == 4:
+            geohash.append(__base32[ch])
+            ch = 0
+    return ''.join(geohash)
+
+def encode_grid(latitude, longitude, precision=12):
+    """
+    Encode a position to the row and column of its cell in the grid of
+    the given precision, without building the geohash string.
+    Positions on a cell border go to the same cell as with encode.
+    """
+    rows, cols = grid_size(precision)
+    row = int(-((latitude + 90.0) * rows // -180.0)) - 1
+    col = int(-((longitude + 180.0) * cols // -360.0)) - 1
+    return min(max(row, 0), rows - 1), min(max(col, 0), cols - 1)
+
+def grid_neighbours(row, col, precision):
+    """
+    Return the grid positions adjacent to the given one. Columns wrap
+    around the antimeridian, rows stop at the poles, so border cells
+    have fewer than 8 neighbours (neighbours() fails on them).
+    """
+    rows, cols = grid_size(precision)
+    positions = set()
+    for d_row in (-1, 0, 1):
+        r = row + d_row
+        if r < 0 or r >= rows:
+            continue
+        for d_col in (-1, 0, 1):
+            positions.add((r, (col + d_col) % cols))
+    positions.discard((row, col))
+    return list(positions)
+
+def haversine(lat1, lon1, lat2, lon2):
+    """
+    Return the great circle distance in meters between two positions.
+    """
+    d_lat = radians(lat2 - lat1)
+    d_lon = radians(lon2 - lon1)
+    a = sin(d_lat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(d_lon / 2) ** 2
+    return 2 * _earth_radius * asin(min(1.0, sqrt(a)))
+
+def grid_reach(distance, row, precision):
+    """
+    Return how many rows and how many columns apart from a cell of the
+    given row a position closer than distance meters (great circle
+    distance, see haversine) to a position of the cell can be. Toward
+    the poles the column reach grows up to the whole grid.
+    """
+    rows, cols = grid_size(precision)
+    height, width = cell_size(precision)
+    angle = distance / _earth_radius
+    row_reach = ceil(degrees(angle) / height)
+    # Farthest latitude from the equator of the two positions
+    latitude = min(90.0, max(abs(-90.0 + (row - row_reach) * height),
+                             abs(-90.0 + (row + 1 + row_reach) * height)))
+    # hav(angle) >= cos(lat1) * cos(lat2) * hav(d_lon)
+    cos_latitude = cos(radians(latitude))
+    if cos_latitude <= 0 or sin(angle / 2) >= cos_latitude:
+        return row_reach, cols // 2
+    d_lon = degrees(2 * asin(sin(angle / 2) / cos_latitude))
+    return row_reach, min(ceil(d_lon / width), cols // 2)
+
+def _walk_segment(lat0, lon0, lat1, lon1, precision):
+    """
+    Yield the grid positions crossed by the segment going from the
+    first position to the second one, in order, excluding the cell of
+    the first position. Each position is adjacent to the previous one.
+    """
+    rows, cols = grid_size(precision)
+    height, width = cell_size(precision)
+    row, col = encode_grid(lat0, lon0, precision)
+    end = encode_grid(lat1, lon1, precision)
+    x0, y0 = (lon0 + 180.0) / width, (lat0 + 90.0) / height
+    dx, dy = (lon1 + 180.0) / width - x0, (lat1 + 90.0) / height - y0
+    step_col = 1 if dx > 0 else -1
+    step_row = 1 if dy > 0 else -1
+    t_max_x = (col + (dx > 0) - x0) / dx if dx else float('inf')
+    t_max_y = (row + (dy > 0) - y0) / dy if dy else float('inf')
+    t_delta_x = abs(1 / dx) if dx else float('inf')
+    t_delta_y = abs(1 / dy) if dy else float('inf')
+    while (row, col) != end:
+        if t_max_x < t_max_y:
+            if t_max_x > 1:
+                break
+            col = min(max(col + step_col, 0), cols - 1)
+            t_max_x += t_delta_x
+        else:
+            if t_max_y > 1:
+                break
+            row = min(max(row + step_row, 0), rows - 1)
+            t_max_y += t_delta_y
+        yield row, col
+    if (row, col) != end:
+        yield end
+
+def encode_path(points, precision=12):
+    """
+    Encode a line given as a sequence of (latitude, longitude) to the
+    ordered list of the geohashes of the cells it passes through.
+    Consecutive repeats are collapsed: returns a list of
+    [geohash, count] where count is the number of points of the line
+    in that cell, 0 for cells that are only crossed.
+    """
+    runs = []
+    previous = None
+    for lat, lon in points:
+        if previous is None:
+            runs.append([encode_grid(lat, lon, precision), 1])
+        else:
+            for position in _walk_segment(previous[0], previous[1], lat, lon, precision):
+                if runs[-1][0] != position:
+                    runs.append([position, 0])
+            runs[-1][1] += 1
+        previous = (lat, lon)
+    return [[from_grid_position(row, col, precision), count] for (row, col), count in runs]
+
+def decode_path(geohashes):
+    """
+    Rebuild a simplified line from a sequence of geohashes, as returned
+    by encode_path (the counts are ignored). Returns the list of
+    (latitude, longitude) of the centers of the cells where the path
+    changes direction, plus its first and last cells.
+    """
+    positions = [grid_position(geohash) for geohash in geohashes]
+    kept = []
+    for i, position in enumerate(positions):
+        if 0 < i < len(positions) - 1:
+            before = (position[0] - positions[i - 1][0], position[1] - positions[i - 1][1])
+            after = (positions[i + 1][0] - position[0], positions[i + 1][1] - position[1])
+            if before == after:
+                continue
+        kept.append(i)
+    points = []
+    for i in kept:
+        lat, lon, lat_err, lon_err = decode_exactly(geohashes[i])
+        points.append((lat, lon))
+    return points
+
+def path_to_string(runs):
+    """
+    Format a path returned by encode_path as text, like 'u09tv:3,u09ty:0'.
+    """
+    return ','.join('{}:{}'.format(geohash, count) for geohash, count in runs)
+
+def path_from_string(text):
+    """
+    Parse a path formatted by path_to_string back to a list of
+    [geohash, count].
+    """
+    runs = []
+    for item in text.split(','):
+        if item:
+            geohash, _, count = item.partition(':')
+            runs.append([geohash, int(count or 1)])
+    return runs
+
+def encode_multi(latitude, longitude, precisions):
+    """
+    Encode a position to geohashes of several precisions at once.
+    Every geohash is a prefix of the finest one, so the position is only
+    encoded once. Returns a dict precision -> geohash.
+    """
+    geohash = encode(latitude, longitude, precision=max(precisions))
+    return {precision: geohash[:precision] for precision in precisions}
+
+def encode_many(latitudes, longitudes, precision=12):
+    """
+    Encode sequences of latitudes and longitudes in a single call.
+    Returns the list of the geohashes, in order.
+    """
+    return [encode(lat, lon, precision=precision) for lat, lon in zip(latitudes, longitudes)]
+
+def decode_extent_many(geohashes):
+    """
+    Decode a sequence of geohashes to their bounding boxes in a single
+    call, each distinct geohash being decoded once. Returns the list of
+    (latitude 1, latitude 2, longitude 1, longitude 2), in order.
+    """
+    extents = {}
+    for geohash in geohashes:
+        if geohash not in extents:
+            extents[geohash] = decode_extent(geohash)
+    return [extents[geohash] for geohash in geohashes]
+
+def neighbours_many(geohashes):
+    """
+    Find the neighbours of a sequence of geohashes in a single call,
+    each distinct geohash being computed once. Returns the list of the
+    neighbours lists, in order.
+    """
+    results = {}
+    for geohash in geohashes:
+        if geohash not in results:
+            results[geohash] = neighbours(geohash)
+    return [results[geohash] for geohash in geohashes]
+
+def to_int(geohash):
+    """
+    Return the integer holding the 5 * len(geohash) bits of the geohash.
+    Integers of geohashes of the same precision sort like the geohashes.
+    """
+    value = 0
+    for c in geohash:
+        value = (value << 5) | __decodemap[c]
+    return value
+
+def from_int(value, precision):
+    """
+    Return the geohash of the given precision held by an integer built
+    by to_int.
+    """
+    geohash = []
+    for shift in range(5 * (precision - 1), -1, -5):
+        geohash.append(__base32[(value >> shift) & 31])
+    return ''.join(geohash)
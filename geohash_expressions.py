@@ -24,7 +24,7 @@
 from qgis.PyQt.QtCore import QSettings, QTranslator, QCoreApplication
 from qgis.PyQt.QtGui import QIcon
 from qgis.PyQt.QtWidgets import QAction
-from qgis.core import QgsExpression
+from qgis.core import QgsApplication, QgsExpression
 
 from .qgis_expression import (geohash,
                               geohash_from_geom,
@@ -41,8 +41,23 @@ from .qgis_expression import (geohash,
                                geohash_southwest,
                                geohash_west,
                                geohash_northwest,
+                               geohash_aggregate,
+                               geohash_path,
+                               geom_from_geohash_path,
+                               geohash_multi,
+                               geohash_lookup,
+                               geohash_cell_area,
+                               geohash_cell_size,
+                               geohash_precision_for_distance,
+                               geohash_dissolve,
+                               geohash_raster_sample,
+                               geohash_thin,
+                               geohash_time_key,
+                               geohash_time_key_split,
                                )
 
+from .geohash_expressions_provider import GeohashExpressionsProvider
+
 # Import the code for the dialog
 from .geohash_expressions_dialog import GeohashExpressionsDialog
 import os.path
@@ -82,6 +97,7 @@ class GeohashExpressions:
         # Check if plugin was started the first time in current QGIS session
         # Must be set in initGui() to survive plugin reloads
         self.first_start = None
+        self.provider = None
 
         #QgsExpression.registerFunction(custom_function1) 
 
@@ -175,6 +191,11 @@ class GeohashExpressions:
 
         return action
 
+    def initProcessing(self):
+        """Register the processing provider of the geohash algorithms."""
+        self.provider = GeohashExpressionsProvider()
+        QgsApplication.processingRegistry().addProvider(self.provider)
+
     def initGui(self):
         """Create the menu entries and toolbar icons inside the QGIS GUI."""
 
@@ -189,6 +210,8 @@ class GeohashExpressions:
         # will be set False in run()
         self.first_start = True
 
+        self.initProcessing()
+
         QgsExpression.registerFunction(geohash)
         QgsExpression.registerFunction(geohash_from_geom)
         QgsExpression.registerFunction(geohash_yx)
@@ -204,6 +227,19 @@ class GeohashExpressions:
         QgsExpression.registerFunction(geohash_southwest)
         QgsExpression.registerFunction(geohash_west)
         QgsExpression.registerFunction(geohash_northwest)
+        QgsExpression.registerFunction(geohash_aggregate)
+        QgsExpression.registerFunction(geohash_path)
+        QgsExpression.registerFunction(geom_from_geohash_path)
+        QgsExpression.registerFunction(geohash_multi)
+        QgsExpression.registerFunction(geohash_lookup)
+        QgsExpression.registerFunction(geohash_cell_area)
+        QgsExpression.registerFunction(geohash_cell_size)
+        QgsExpression.registerFunction(geohash_precision_for_distance)
+        QgsExpression.registerFunction(geohash_dissolve)
+        QgsExpression.registerFunction(geohash_raster_sample)
+        QgsExpression.registerFunction(geohash_thin)
+        QgsExpression.registerFunction(geohash_time_key)
+        QgsExpression.registerFunction(geohash_time_key_split)
 
 
     def unload(self):
@@ -214,6 +250,8 @@ class GeohashExpressions:
                 action)
             self.iface.removeToolBarIcon(action)
 
+        QgsApplication.processingRegistry().removeProvider(self.provider)
+
         QgsExpression.unregisterFunction('geohash')
         QgsExpression.unregisterFunction('geohash_from_geom')
         QgsExpression.unregisterFunction('geohash_yx')
@@ -229,6 +267,19 @@ class GeohashExpressions:
         QgsExpression.unregisterFunction('geohash_southwest')
         QgsExpression.unregisterFunction('geohash_west')
         QgsExpression.unregisterFunction('geohash_northwest')
+        QgsExpression.unregisterFunction('geohash_aggregate')
+        QgsExpression.unregisterFunction('geohash_path')
+        QgsExpression.unregisterFunction('geom_from_geohash_path')
+        QgsExpression.unregisterFunction('geohash_multi')
+        QgsExpression.unregisterFunction('geohash_lookup')
+        QgsExpression.unregisterFunction('geohash_cell_area')
+        QgsExpression.unregisterFunction('geohash_cell_size')
+        QgsExpression.unregisterFunction('geohash_precision_for_distance')
+        QgsExpression.unregisterFunction('geohash_dissolve')
+        QgsExpression.unregisterFunction('geohash_raster_sample')
+        QgsExpression.unregisterFunction('geohash_thin')
+        QgsExpression.unregisterFunction('geohash_time_key')
+        QgsExpression.unregisterFunction('geohash_time_key_split')
 
 
     def run(self):
@@ -240,12 +291,8 @@ class GeohashExpressions:
             self.first_start = False
             self.dlg = GeohashExpressionsDialog()
 
-        # show the dialog
+        # show the dialog, it is not modal so QGIS stays usable while
+        # its background task runs
         self.dlg.show()
-        # Run the dialog event loop
-        result = self.dlg.exec()
-        # See if OK was pressed
-        if result:
-            # Do something useful here - delete the line containing pass and
-            # substitute with your code.
-            pass
+        self.dlg.raise_()
+        self.dlg.activateWindow()
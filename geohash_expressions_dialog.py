@@ -26,6 +26,9 @@ import os
 
 from qgis.PyQt import uic
 from qgis.PyQt import QtWidgets
+from qgis.core import QgsApplication, QgsMapLayerProxyModel
+
+from .geohash_task import GeohashColumnTask
 
 # This loads your .ui file so that PyQt can populate your plugin with the elements from Qt Designer
 FORM_CLASS, _ = uic.loadUiType(os.path.join(
@@ -43,3 +46,59 @@ class GeohashExpressionsDialog(QtWidgets.QDialog, FORM_CLASS):
         # http://qt-project.org/doc/qt-4.8/designer-using-a-ui-file.html
         # #widgets-and-dialogs-with-auto-connect
         self.setupUi(self)
+
+        self.task = None
+        self.layer_combo_box.setFilters(QgsMapLayerProxyModel.VectorLayer)
+        self.compute_button.clicked.connect(self.start_task)
+        self.cancel_button.clicked.connect(self.cancel_task)
+
+    def start_task(self):
+        """Start computing the geohash column in a background task."""
+        layer = self.layer_combo_box.currentLayer()
+        field_name = self.field_name_line_edit.text().strip()
+        if layer is None or not field_name:
+            self.status_label.setText(self.tr('Choose a layer and a field name'))
+            return
+
+        try:
+            self.task = GeohashColumnTask(layer, field_name, self.precision_spin_box.value())
+        except ValueError as e:
+            self.status_label.setText(str(e))
+            return
+
+        self.task.progressChanged.connect(self.progress_changed)
+        self.task.taskCompleted.connect(self.task_completed)
+        self.task.taskTerminated.connect(self.task_terminated)
+        self.progress_bar.setValue(0)
+        self.status_label.setText(self.tr('Computing...'))
+        self.compute_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        QgsApplication.taskManager().addTask(self.task)
+
+    def cancel_task(self):
+        if self.task is not None:
+            self.task.cancel()
+
+    def progress_changed(self, progress):
+        self.progress_bar.setValue(int(progress))
+
+    def task_completed(self):
+        self.progress_bar.setValue(100)
+        self.status_label.setText(self.tr('Done'))
+        self.task_ended()
+
+    def task_terminated(self):
+        if self.task.error:
+            message = self.task.error
+        else:
+            message = self.tr('Canceled')
+        if self.task.written:
+            message = self.tr('{}, the column is partially filled ({} of {} features)').format(
+                message, self.task.written, self.task.total)
+        self.status_label.setText(message)
+        self.task_ended()
+
+    def task_ended(self):
+        self.task = None
+        self.compute_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
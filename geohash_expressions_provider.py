@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ GeohashExpressionsProvider
+                                 A QGIS plugin
+ This plugin adds four expression functions to work with geohash
+ Generated by Plugin Builder: http://g-sherman.github.io/Qgis-Plugin-Builder/
+                             -------------------
+        begin                : 2023-12-09
+        git sha              : $Format:%H$
+        copyright            : (C) 2023 by Valentin BUIRA
+        email                : valentin.buira at gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import os
+
+from qgis.core import QgsProcessingProvider
+from qgis.PyQt.QtGui import QIcon
+
+from .near_duplicates_algorithm import NearDuplicatePointsAlgorithm
+from .geohash_path_algorithm import GeohashPathAlgorithm
+from .add_geohash_columns_algorithm import AddGeohashColumnsAlgorithm
+from .geometry_from_geohash_algorithm import GeometryFromGeohashAlgorithm
+from .sort_by_geohash_algorithm import SortByGeohashAlgorithm
+from .partitioned_export_algorithm import PartitionedExportAlgorithm
+from .build_lookup_table_algorithm import BuildLookupTableAlgorithm
+from .dissolve_geohash_algorithm import DissolveGeohashAlgorithm
+from .build_digest_tree_algorithm import BuildDigestTreeAlgorithm
+from .compare_digest_trees_algorithm import CompareDigestTreesAlgorithm
+from .sample_raster_algorithm import SampleRasterAlgorithm
+from .execute_sql_algorithm import ExecuteSqlAlgorithm
+from .thin_points_algorithm import ThinPointsAlgorithm
+from .space_time_aggregate_algorithm import SpaceTimeAggregateAlgorithm
+
+
+class GeohashExpressionsProvider(QgsProcessingProvider):
+    """Processing provider of the geohash algorithms."""
+
+    def loadAlgorithms(self):
+        """Loads all algorithms belonging to this provider."""
+        self.addAlgorithm(NearDuplicatePointsAlgorithm())
+        self.addAlgorithm(GeohashPathAlgorithm())
+        self.addAlgorithm(AddGeohashColumnsAlgorithm())
+        self.addAlgorithm(GeometryFromGeohashAlgorithm())
+        self.addAlgorithm(SortByGeohashAlgorithm())
+        self.addAlgorithm(PartitionedExportAlgorithm())
+        self.addAlgorithm(BuildLookupTableAlgorithm())
+        self.addAlgorithm(DissolveGeohashAlgorithm())
+        self.addAlgorithm(BuildDigestTreeAlgorithm())
+        self.addAlgorithm(CompareDigestTreesAlgorithm())
+        self.addAlgorithm(SampleRasterAlgorithm())
+        self.addAlgorithm(ExecuteSqlAlgorithm())
+        self.addAlgorithm(ThinPointsAlgorithm())
+        self.addAlgorithm(SpaceTimeAggregateAlgorithm())
+
+    def id(self):
+        """Returns the unique provider id, used for identifying the provider.
+
+        This string should be a unique, short, character only string,
+        eg "qgis" or "gdal". This string should not be localised.
+        """
+        return 'geohash'
+
+    def name(self):
+        """Returns the provider name, which is used to describe the provider
+        within the GUI.
+
+        This string should be short (e.g. "Lastools") and localised.
+        """
+        return self.tr('Geohash')
+
+    def icon(self):
+        """Should return a QIcon which is used for your provider inside
+        the Processing toolbox.
+        """
+        return QIcon(os.path.join(os.path.dirname(__file__), 'icon.png'))
+
+    def longName(self):
+        """Returns the a longer version of the provider name, which can
+        include extra details such as version numbers.
+        """
+        return self.name()
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ GeohashPathAlgorithm
+                                 A QGIS plugin
+ This plugin adds four expression functions to work with geohash
+ Generated by Plugin Builder: http://g-sherman.github.io/Qgis-Plugin-Builder/
+                             -------------------
+        begin                : 2023-12-09
+        git sha              : $Format:%H$
+        copyright            : (C) 2023 by Valentin BUIRA
+        email                : valentin.buira at gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+from qgis.PyQt.QtCore import QCoreApplication, QVariant
+from qgis.core import (QgsCoordinateReferenceSystem,
+                       QgsCoordinateTransform,
+                       QgsField,
+                       QgsGeometry,
+                       QgsProcessing,
+                       QgsProcessingFeatureBasedAlgorithm,
+                       QgsProcessingParameterNumber,
+                       QgsWkbTypes)
+
+from .geohash import path_to_string
+from .qgis_expression import line_to_geohash_path, geohash_path_to_line
+
+
+class GeohashPathAlgorithm(QgsProcessingFeatureBasedAlgorithm):
+    """
+    Encode the lines of a layer to the sequence of geohash cells they
+    pass through, and replace their geometry by the simplified line
+    rebuilt from those cells.
+    """
+
+    PRECISION = 'PRECISION'
+    FIELD_NAME = 'geohash_path'
+
+    def initParameters(self, config=None):
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.PRECISION,
+                self.tr('Precision'),
+                QgsProcessingParameterNumber.Integer,
+                defaultValue=7,
+                minValue=1,
+                maxValue=12
+            )
+        )
+
+    def inputLayerTypes(self):
+        return [QgsProcessing.TypeVectorLine]
+
+    def outputName(self):
+        return self.tr('Geohash paths')
+
+    def outputWkbType(self, input_wkb_type):
+        return QgsWkbTypes.LineString
+
+    def outputCrs(self, input_crs):
+        return QgsCoordinateReferenceSystem('EPSG:4326')
+
+    def outputFields(self, input_fields):
+        input_fields.append(QgsField(self.FIELD_NAME, QVariant.String))
+        return input_fields
+
+    def prepareAlgorithm(self, parameters, context, feedback):
+        self.precision = self.parameterAsInt(parameters, self.PRECISION, context)
+        source = self.parameterAsSource(parameters, 'INPUT', context)
+        self.transform = QgsCoordinateTransform(source.sourceCrs(),
+                                                QgsCoordinateReferenceSystem('EPSG:4326'),
+                                                context.transformContext())
+        return True
+
+    def processFeature(self, feature, context, feedback):
+        geometry = feature.geometry()
+        if geometry.isNull():
+            feature.setAttributes(feature.attributes() + [None])
+            return [feature]
+        geometry.transform(self.transform)
+        runs = line_to_geohash_path(geometry, self.precision)
+        line = geohash_path_to_line(runs)
+        # A path staying in a single cell has no line, keep the feature without geometry
+        feature.setGeometry(line if line.type() == QgsWkbTypes.LineGeometry else QgsGeometry())
+        feature.setAttributes(feature.attributes() + [path_to_string(runs)])
+        return [feature]
+
+    def name(self):
+        return 'geohashpath'
+
+    def displayName(self):
+        return self.tr('Encode lines to geohash paths')
+
+    def group(self):
+        return self.tr('Vector geometry')
+
+    def groupId(self):
+        return 'vectorgeometry'
+
+    def shortHelpString(self):
+        return self.tr('Encodes each line to the ordered sequence of geohash cells it passes '
+                       'through, with consecutive repeats collapsed with their vertex count, '
+                       'like "u09tu:2,u09tv:1". The geometry is replaced by the simplified line '
+                       'joining the centers of the cells where the path changes direction.')
+
+    def tr(self, string):
+        return QCoreApplication.translate('Processing', string)
+
+    def createInstance(self):
+        return GeohashPathAlgorithm()
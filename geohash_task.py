@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ GeohashColumnTask
+                                 A QGIS plugin
+ This plugin adds four expression functions to work with geohash
+ Generated by Plugin Builder: http://g-sherman.github.io/Qgis-Plugin-Builder/
+                             -------------------
+        begin                : 2023-12-09
+        git sha              : $Format:%H$
+        copyright            : (C) 2023 by Valentin BUIRA
+        email                : valentin.buira at gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+from array import array
+
+from qgis.PyQt.QtCore import QVariant
+from qgis.core import (QgsCoordinateReferenceSystem,
+                       QgsCoordinateTransform,
+                       QgsDataProvider,
+                       QgsFeatureRequest,
+                       QgsField,
+                       QgsProject,
+                       QgsProviderRegistry,
+                       QgsTask,
+                       QgsVectorDataProvider,
+                       QgsVectorLayerFeatureSource)
+
+from .geohash import encode
+from .thinning import ReservoirThinner, ThinnedIds
+
+
+class GeohashColumnTask(QgsTask):
+    """
+    Fill a geohash column of a layer in the background.
+
+    The features are read from a feature source snapshot of the layer,
+    then the geohashes are written with one changeAttributeValues call
+    per batch, so each batch is a single transaction instead of one edit
+    per feature. The layer data provider belongs to the main thread, the
+    batches are written through a separate provider opened on the layer
+    source in the task thread, so memory layers are not supported.
+    The field is created, if missing, when the task is constructed, so
+    the task must be constructed in the main thread. It is removed again
+    if the task ends before any batch was written.
+    """
+
+    def __init__(self, layer, field_name, precision, batch_size=50000):
+        super().__init__('Geohash column {} of {}'.format(field_name, layer.name()), QgsTask.CanCancel)
+        self.layer = layer
+        self.precision = precision
+        self.batch_size = batch_size
+        self.error = None
+        # Number of features whose geohash was written
+        self.written = 0
+
+        if layer.isEditable():
+            raise ValueError('The layer {} is in edit mode, save or discard the edits first'.format(layer.name()))
+        # The batches are written through a provider reopened on the layer
+        # source, a memory layer source would open a new empty layer
+        if layer.providerType() == 'memory':
+            raise ValueError('The layer {} is a memory layer, save it to a file first'.format(layer.name()))
+        provider = layer.dataProvider()
+        if not provider.capabilities() & QgsVectorDataProvider.ChangeAttributeValues:
+            raise ValueError('The layer {} cannot be modified'.format(layer.name()))
+
+        self.field_name = field_name
+        self.field_added = provider.fields().lookupField(field_name) < 0
+        if self.field_added:
+            if not provider.capabilities() & QgsVectorDataProvider.AddAttributes:
+                raise ValueError('Fields cannot be added to the layer {}'.format(layer.name()))
+            provider.addAttributes([QgsField(field_name, QVariant.String, len=precision)])
+            layer.updateFields()
+
+        self.provider_key = layer.providerType()
+        self.uri = layer.source()
+        self.source = QgsVectorLayerFeatureSource(layer)
+        self.transform = QgsCoordinateTransform(layer.crs(),
+                                                QgsCoordinateReferenceSystem('EPSG:4326'),
+                                                QgsProject.instance().transformContext())
+        self.total = layer.featureCount()
+
+    def _set_progress(self, progress):
+        # Only report whole percents, progress signals are queued to the main thread
+        if int(progress) != int(self.progress()):
+            self.setProgress(progress)
+
+    def run(self):
+        total = self.total or 1
+        request = QgsFeatureRequest().setNoAttributes()
+        geohashes = {}
+        for count, feature in enumerate(self.source.getFeatures(request)):
+            if self.isCanceled():
+                return False
+            geometry = feature.geometry()
+            if not geometry.isNull():
+                point = self.transform.transform(geometry.centroid().asPoint())
+                geohashes[feature.id()] = encode(point.y(), point.x(), precision=self.precision)
+            self._set_progress(50 * count / total)
+
+        # Reading is done before writing so no read statement is open while the batches are committed
+        provider = QgsProviderRegistry.instance().createProvider(self.provider_key, self.uri,
+                                                                 QgsDataProvider.ProviderOptions())
+        if provider is None or not provider.isValid():
+            self.error = 'Cannot open the layer {} for writing'.format(self.uri)
+            return False
+        field_index = provider.fields().lookupField(self.field_name)
+        if field_index < 0:
+            self.error = 'The field {} is missing from the layer {}'.format(self.field_name, self.uri)
+            return False
+        fids = list(geohashes)
+        for start in range(0, len(fids), self.batch_size):
+            if self.isCanceled():
+                return False
+            batch = {fid: {field_index: geohashes[fid]} for fid in fids[start:start + self.batch_size]}
+            # Providers silently skip the ids they do not have, check that
+            # the reopened provider holds the features of the snapshot
+            request = QgsFeatureRequest().setFilterFids(list(batch)).setNoAttributes()
+            request.setFlags(QgsFeatureRequest.NoGeometry)
+            if sum(1 for feature in provider.getFeatures(request)) != len(batch):
+                self.error = 'The features of the layer {} changed while computing the geohashes'.format(self.uri)
+                return False
+            if not provider.changeAttributeValues(batch):
+                self.error = provider.errors()[-1] if provider.errors() else 'Cannot write the geohashes'
+                return False
+            self.written += len(batch)
+            self._set_progress(50 + 50 * (start + len(batch)) / len(fids))
+        return True
+
+    def finished(self, result):
+        # Runs in the main thread, the layer caches are stale whether or
+        # not every batch was written
+        if not result and not self.written and self.field_added:
+            provider = self.layer.dataProvider()
+            provider.deleteAttributes([provider.fields().lookupField(self.field_name)])
+            self.layer.updateFields()
+        self.layer.reload()
+        self.layer.triggerRepaint()
+
+
+def thin_features(source, precision, max_points, transform_context, is_canceled=None):
+    """
+    Scan a layer or a feature source once and return the ThinnedIds of
+    the features kept when thinning it to at most max_points per geohash
+    cell, or None when is_canceled returns true.
+    """
+    request = QgsFeatureRequest()
+    request.setDestinationCrs(QgsCoordinateReferenceSystem('EPSG:4326'), transform_context)
+    request.setNoAttributes()
+
+    thinner = ReservoirThinner(max_points)
+    dropped = array('q')
+    for feature in source.getFeatures(request):
+        if is_canceled is not None and is_canceled():
+            return None
+        geometry = feature.geometry()
+        if geometry.isNull():
+            continue
+        point = geometry.centroid().asPoint()
+        fid = thinner.add(encode(point.y(), point.x(), precision=precision), feature.id())
+        if fid is not None:
+            dropped.append(fid)
+    return ThinnedIds([fid for cell, kept, count in thinner.cells() for fid in kept], dropped)
+
+
+class ThinningTask(QgsTask):
+    """
+    Thin a layer in the background for geohash_thin.
+
+    The features are read from a feature source snapshot of the layer
+    taken when the task is constructed, so the task must be constructed
+    in the main thread. The kept feature ids are in kept once the task
+    is completed.
+    """
+
+    def __init__(self, layer, precision, max_points):
+        super().__init__('Geohash thinning of {}'.format(layer.name()), QgsTask.CanCancel)
+        self.layer_id = layer.id()
+        self.precision = precision
+        self.max_points = max_points
+        self.kept = None
+
+        self.source = QgsVectorLayerFeatureSource(layer)
+        self.transform_context = QgsProject.instance().transformContext()
+
+    def run(self):
+        self.kept = thin_features(self.source, self.precision, self.max_points,
+                                  self.transform_context, self.isCanceled)
+        return self.kept is not None
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ GeometryFromGeohashAlgorithm
+                                 A QGIS plugin
+ This plugin adds four expression functions to work with geohash
+ Generated by Plugin Builder: http://g-sherman.github.io/Qgis-Plugin-Builder/
+                             -------------------
+        begin                : 2023-12-09
+        git sha              : $Format:%H$
+        copyright            : (C) 2023 by Valentin BUIRA
+        email                : valentin.buira at gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+from qgis.PyQt.QtCore import QCoreApplication
+from qgis.core import (QgsCoordinateReferenceSystem,
+                       QgsFeature,
+                       QgsFeatureSink,
+                       QgsGeometry,
+                       QgsPointXY,
+                       QgsProcessing,
+                       QgsProcessingAlgorithm,
+                       QgsProcessingParameterEnum,
+                       QgsProcessingParameterFeatureSink,
+                       QgsProcessingParameterFeatureSource,
+                       QgsProcessingParameterField,
+                       QgsRectangle,
+                       QgsWkbTypes)
+
+from .geohash import decode_extent
+
+
+class GeometryFromGeohashAlgorithm(QgsProcessingAlgorithm):
+    """
+    Build a point or cell polygon layer from a geohash text column.
+
+    The features are processed in batches, and each distinct geohash of
+    a batch is decoded only once, straight to floats.
+    """
+
+    INPUT = 'INPUT'
+    FIELD = 'FIELD'
+    GEOMETRY_TYPE = 'GEOMETRY_TYPE'
+    OUTPUT = 'OUTPUT'
+
+    BATCH_SIZE = 10000
+
+    def initAlgorithm(self, config):
+        self.addParameter(
+            QgsProcessingParameterFeatureSource(
+                self.INPUT,
+                self.tr('Input layer'),
+                [QgsProcessing.TypeVector]
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterField(
+                self.FIELD,
+                self.tr('Geohash field'),
+                parentLayerParameterName=self.INPUT,
+                type=QgsProcessingParameterField.String
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterEnum(
+                self.GEOMETRY_TYPE,
+                self.tr('Geometry'),
+                options=[self.tr('Cell center point'), self.tr('Cell polygon')],
+                defaultValue=0
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterFeatureSink(
+                self.OUTPUT,
+                self.tr('Geometries from geohash')
+            )
+        )
+
+    def processAlgorithm(self, parameters, context, feedback):
+        source = self.parameterAsSource(parameters, self.INPUT, context)
+        field_index = source.fields().lookupField(self.parameterAsString(parameters, self.FIELD, context))
+        polygons = self.parameterAsEnum(parameters, self.GEOMETRY_TYPE, context) == 1
+
+        (sink, dest_id) = self.parameterAsSink(parameters, self.OUTPUT, context, source.fields(),
+                                               QgsWkbTypes.Polygon if polygons else QgsWkbTypes.Point,
+                                               QgsCoordinateReferenceSystem('EPSG:4326'))
+
+        total = 100.0 / source.featureCount() if source.featureCount() else 0
+        invalid = 0
+        batch = []
+
+        def flush():
+            nonlocal invalid
+            geometries = {}
+            for feature in batch:
+                geohash = feature[field_index]
+                if not isinstance(geohash, str) or not geohash.strip():
+                    continue
+                geohash = geohash.strip().lower()
+                if geohash in geometries:
+                    continue
+                try:
+                    lat_min, lat_max, lon_min, lon_max = decode_extent(geohash)
+                except KeyError:
+                    geometries[geohash] = QgsGeometry()
+                    continue
+                if polygons:
+                    geometries[geohash] = QgsGeometry.fromRect(QgsRectangle(lon_min, lat_min, lon_max, lat_max))
+                else:
+                    geometries[geohash] = QgsGeometry.fromPointXY(QgsPointXY((lon_min + lon_max) / 2, (lat_min + lat_max) / 2))
+
+            for feature in batch:
+                geohash = feature[field_index]
+                output = QgsFeature(feature)
+                if isinstance(geohash, str) and geohash.strip():
+                    output.setGeometry(geometries[geohash.strip().lower()])
+                else:
+                    output.setGeometry(QgsGeometry())
+                if output.geometry().isNull():
+                    invalid += 1
+                sink.addFeature(output, QgsFeatureSink.FastInsert)
+            batch.clear()
+
+        for current, feature in enumerate(source.getFeatures()):
+            if feedback.isCanceled():
+                break
+            batch.append(feature)
+            if len(batch) >= self.BATCH_SIZE:
+                flush()
+                feedback.setProgress(int(current * total))
+        flush()
+
+        if invalid:
+            feedback.pushInfo(self.tr('{} features have no valid geohash').format(invalid))
+        return {self.OUTPUT: dest_id}
+
+    def name(self):
+        return 'geometryfromgeohash'
+
+    def displayName(self):
+        return self.tr('Geometries from geohash field')
+
+    def group(self):
+        return self.tr('Vector creation')
+
+    def groupId(self):
+        return 'vectorcreation'
+
+    def shortHelpString(self):
+        return self.tr('Creates a point layer (cell centers) or a polygon layer (cell bounds) from '
+                       'a field holding geohash strings. Each distinct geohash is decoded only once '
+                       'per batch of features. Features without a valid geohash are kept without '
+                       'geometry.')
+
+    def tr(self, string):
+        return QCoreApplication.translate('Processing', string)
+
+    def createInstance(self):
+        return GeometryFromGeohashAlgorithm()
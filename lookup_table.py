@@ -0,0 +1,236 @@
+"""
+Compact on-disk geohash -> value lookup tables.
+
+A table file holds a fixed size header followed by the sorted integer
+keys (see geohash.to_int) of the geohashes, all of the same precision,
+as unsigned 64 bits integers, then the values as 64 bits floats:
+
+    magic 'GHLT' | version u16 | precision u8 | byte order u8 | count u64
+    keys  u64 * count
+    values f64 * count
+
+Tables are opened with mmap and searched with a binary search straight
+on the mapped pages, nothing is copied or loaded up front, and the
+pages are shared between the processes reading the same file.
+"""
+import heapq
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from .geohash import to_int
+
+_magic = b'GHLT'
+_version = 1
+_header = struct.Struct('<4sHBBQ')
+_byte_orders = {'little': 0, 'big': 1}
+_count = struct.Struct('<Q')
+
+# Rows sorted in memory at once, and rows read at once from a sorted run
+_chunk_size = 1 << 20
+_read_block = 1 << 16
+
+# Open tables, keyed by path and holding (modification time, table)
+_open_tables = {}
+
+
+class _Canceled(Exception):
+    pass
+
+
+@contextmanager
+def replace_atomically(path):
+    """
+    Open a temporary file next to path for writing, renamed over path
+    when the block exits normally and removed when it raises, so the
+    processes that have the previous file mapped keep reading it safely.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            yield f
+        if os.path.exists(path):
+            shutil.copymode(path, temp_path)
+        else:
+            os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+def _write_chunk(keys, values, directory):
+    """
+    Sort a chunk of keys and values by key, keeping the last value of
+    duplicated keys, and write it to a run file. Returns its path.
+    """
+    # The sort is stable, equal keys stay in input order
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+    sorted_keys = array('Q')
+    sorted_values = array('d')
+    for i in order:
+        if sorted_keys and sorted_keys[-1] == keys[i]:
+            sorted_values[-1] = values[i]
+        else:
+            sorted_keys.append(keys[i])
+            sorted_values.append(values[i])
+
+    fd, path = tempfile.mkstemp(suffix='.run', dir=directory)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(_count.pack(len(sorted_keys)))
+        sorted_keys.tofile(f)
+        sorted_values.tofile(f)
+    return path
+
+def _read_chunk(path, index):
+    """
+    Yield the (key, index, value) of a run file, reading it by blocks.
+    """
+    with open(path, 'rb') as keys_file, open(path, 'rb') as values_file:
+        count, = _count.unpack(keys_file.read(_count.size))
+        values_file.seek(_count.size + 8 * count)
+        for start in range(0, count, _read_block):
+            size = min(_read_block, count - start)
+            keys = array('Q')
+            keys.fromfile(keys_file, size)
+            values = array('d')
+            values.fromfile(values_file, size)
+            for key, value in zip(keys, values):
+                yield key, index, value
+
+def build_table(path, items, precision, is_canceled=None):
+    """
+    Write a lookup table from an iterable of (geohash, value). Geohashes
+    longer than precision are truncated, shorter ones are skipped. When
+    a geohash appears several times the last value is kept.
+    Returns the number of rows written, or None when is_canceled returns
+    true, in which case path is left untouched.
+
+    The items are sorted by chunks of _chunk_size rows written to run
+    files and merged, so only one chunk is held in memory. The table is
+    written to a temporary file renamed over path at the end, processes
+    that have the previous table mapped keep reading it safely.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.TemporaryDirectory(dir=directory) as run_dir:
+        runs = []
+        keys = array('Q')
+        values = array('d')
+        for geohash, value in items:
+            if len(geohash) < precision:
+                continue
+            keys.append(to_int(geohash[:precision]))
+            values.append(float(value))
+            if len(keys) >= _chunk_size:
+                runs.append(_write_chunk(keys, values, run_dir))
+                keys = array('Q')
+                values = array('d')
+        if is_canceled is not None and is_canceled():
+            return None
+        if keys or not runs:
+            runs.append(_write_chunk(keys, values, run_dir))
+        del keys, values
+
+        try:
+            with replace_atomically(path) as f, tempfile.TemporaryFile(dir=run_dir) as values_file:
+                f.write(b'\0' * _header.size)
+                count = 0
+                last_key = None
+                block_keys, block_values = array('Q'), array('d')
+                # Equal keys come out by run index, the last one wins
+                for key, index, value in heapq.merge(*[_read_chunk(run, i) for i, run in enumerate(runs)]):
+                    if key == last_key:
+                        if block_values:
+                            block_values[-1] = value
+                        else:
+                            # The previous value was already flushed
+                            values_file.seek(-8, os.SEEK_END)
+                            array('d', [value]).tofile(values_file)
+                        continue
+                    last_key = key
+                    block_keys.append(key)
+                    block_values.append(value)
+                    count += 1
+                    if len(block_keys) >= _read_block:
+                        block_keys.tofile(f)
+                        block_values.tofile(values_file)
+                        block_keys, block_values = array('Q'), array('d')
+                block_keys.tofile(f)
+                block_values.tofile(values_file)
+
+                values_file.seek(0)
+                shutil.copyfileobj(values_file, f)
+                f.seek(0)
+                f.write(_header.pack(_magic, _version, precision, _byte_orders[sys.byteorder], count))
+                if is_canceled is not None and is_canceled():
+                    raise _Canceled()
+        except _Canceled:
+            return None
+    return count
+
+
+class LookupTable:
+    """
+    A lookup table file mapped in memory.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            header = f.read(_header.size)
+            if len(header) < _header.size:
+                raise ValueError('{} is not a geohash lookup table'.format(path))
+            magic, version, self.precision, byte_order, self.count = _header.unpack(header)
+            if magic != _magic or version != _version:
+                raise ValueError('{} is not a geohash lookup table'.format(path))
+            if byte_order != _byte_orders[sys.byteorder]:
+                raise ValueError('{} was built on a platform with another byte order'.format(path))
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        data = memoryview(self._mmap)
+        keys_end = _header.size + 8 * self.count
+        self._keys = data[_header.size:keys_end].cast('Q')
+        self._values = data[keys_end:keys_end + 8 * self.count].cast('d')
+
+    def get(self, geohash, default=None):
+        """
+        Return the value of the cell of the geohash, or default. Geohashes
+        longer than the precision of the table are truncated.
+        """
+        if len(geohash) < self.precision:
+            return default
+        try:
+            key = to_int(geohash[:self.precision])
+        except KeyError:
+            return default
+        i = bisect_left(self._keys, key)
+        if i < self.count and self._keys[i] == key:
+            return self._values[i]
+        return default
+
+    def close(self):
+        self._keys.release()
+        self._values.release()
+        self._mmap.close()
+
+
+def open_table(path):
+    """
+    Return the LookupTable of the file, opened once per path and reopened
+    when the file is modified.
+    """
+    path = os.path.abspath(path)
+    mtime = os.path.getmtime(path)
+    cached = _open_tables.get(path)
+    if cached is not None:
+        if cached[0] == mtime:
+            return cached[1]
+        cached[1].close()
+    table = LookupTable(path)
+    _open_tables[path] = (mtime, table)
+    return table
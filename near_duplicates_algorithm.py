@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ NearDuplicatePointsAlgorithm
+                                 A QGIS plugin
+ This plugin adds four expression functions to work with geohash
+ Generated by Plugin Builder: http://g-sherman.github.io/Qgis-Plugin-Builder/
+                             -------------------
+        begin                : 2023-12-09
+        git sha              : $Format:%H$
+        copyright            : (C) 2023 by Valentin BUIRA
+        email                : valentin.buira at gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+from bisect import bisect_left, bisect_right
+
+from qgis.PyQt.QtCore import QCoreApplication, QVariant
+from qgis.core import (QgsCoordinateReferenceSystem,
+                       QgsCoordinateTransform,
+                       QgsFeature,
+                       QgsFeatureRequest,
+                       QgsFeatureSink,
+                       QgsField,
+                       QgsFields,
+                       QgsGeometry,
+                       QgsPointXY,
+                       QgsProcessing,
+                       QgsProcessingAlgorithm,
+                       QgsProcessingParameterFeatureSink,
+                       QgsProcessingParameterMultipleLayers,
+                       QgsProcessingParameterNumber,
+                       QgsWkbTypes)
+
+from .cell_metrics import precision_for_distance
+from .geohash import encode_grid, grid_reach, grid_size, haversine
+
+
+class NearDuplicatePointsAlgorithm(QgsProcessingAlgorithm):
+    """
+    Find points closer than a tolerance to each other across one or
+    more layers.
+
+    Points are bucketed by geohash cell at a precision whose cells are
+    about as large as the tolerance, so each point only needs to be
+    compared with the points of the cells within reach of the tolerance,
+    the adjacent cells for most of the globe and more columns toward the
+    poles. Buckets are visited in sorted order and each bucket is only
+    compared with the buckets that come after it, which lets it be
+    released as soon as it has been visited.
+    """
+
+    INPUT = 'INPUT'
+    TOLERANCE = 'TOLERANCE'
+    OUTPUT = 'OUTPUT'
+
+    def initAlgorithm(self, config):
+        self.addParameter(
+            QgsProcessingParameterMultipleLayers(
+                self.INPUT,
+                self.tr('Input point layers'),
+                QgsProcessing.TypeVectorPoint
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.TOLERANCE,
+                self.tr('Tolerance (meters)'),
+                QgsProcessingParameterNumber.Double,
+                defaultValue=1.0,
+                minValue=0.0
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterFeatureSink(
+                self.OUTPUT,
+                self.tr('Duplicate clusters')
+            )
+        )
+
+    def processAlgorithm(self, parameters, context, feedback):
+        layers = self.parameterAsLayerList(parameters, self.INPUT, context)
+        tolerance = self.parameterAsDouble(parameters, self.TOLERANCE, context)
+        wgs84 = QgsCoordinateReferenceSystem('EPSG:4326')
+
+        # Cells at least as wide as the tolerance everywhere in the data
+        # keep the comparisons to the adjacent cells. Above 85 degrees
+        # the cells would get too large, the columns within reach of the
+        # tolerance are compared instead.
+        max_latitude = 0.0
+        for layer in layers:
+            transform = QgsCoordinateTransform(layer.crs(), wgs84, context.transformContext())
+            extent = transform.transformBoundingBox(layer.extent())
+            max_latitude = max(max_latitude, abs(extent.yMinimum()), abs(extent.yMaximum()))
+        precision = precision_for_distance(tolerance, min(max_latitude, 85.0))
+        feedback.pushInfo(self.tr('Bucketing points at geohash precision {}').format(precision))
+
+        # Parallel lists keep the per point footprint small
+        lats, lons, layer_ids, fids = [], [], [], []
+        buckets = {}
+        total = sum(layer.featureCount() for layer in layers) or 1
+        request = QgsFeatureRequest().setNoAttributes()
+        request.setDestinationCrs(wgs84, context.transformContext())
+        for layer_index, layer in enumerate(layers):
+            for feature in layer.getFeatures(request):
+                if feedback.isCanceled():
+                    return {}
+                geometry = feature.geometry()
+                if geometry.isNull():
+                    continue
+                point = geometry.centroid().asPoint()
+                index = len(lats)
+                lats.append(point.y())
+                lons.append(point.x())
+                layer_ids.append(layer_index)
+                fids.append(feature.id())
+                buckets.setdefault(encode_grid(point.y(), point.x(), precision), []).append(index)
+                if index % 10000 == 0:
+                    feedback.setProgress(50 * index / total)
+
+        parents = list(range(len(lats)))
+
+        def find(i):
+            while parents[i] != i:
+                parents[i] = parents[parents[i]]
+                i = parents[i]
+            return i
+
+        def compare(i, j):
+            if haversine(lats[i], lons[i], lats[j], lons[j]) <= tolerance:
+                root_i, root_j = find(i), find(j)
+                if root_i != root_j:
+                    parents[max(root_i, root_j)] = min(root_i, root_j)
+
+        cells = sorted(buckets)
+        # Sorted columns of the non empty cells of each row
+        row_cols = {}
+        for row, col in cells:
+            row_cols.setdefault(row, []).append(col)
+        rows, cols = grid_size(precision)
+
+        def neighbours(row, col):
+            row_reach, col_reach = grid_reach(tolerance, row, precision)
+            # Rows before this one have already been visited and released
+            for r in range(row, min(row + row_reach, rows - 1) + 1):
+                candidates = row_cols.get(r, ())
+                if 2 * col_reach + 1 >= cols:
+                    ranges = [(0, cols - 1)]
+                elif col - col_reach < 0:
+                    ranges = [(0, col + col_reach), (col - col_reach + cols, cols - 1)]
+                elif col + col_reach >= cols:
+                    ranges = [(col - col_reach, cols - 1), (0, col + col_reach - cols)]
+                else:
+                    ranges = [(col - col_reach, col + col_reach)]
+                for start, end in ranges:
+                    for c in candidates[bisect_left(candidates, start):bisect_right(candidates, end)]:
+                        if (r, c) != (row, col):
+                            yield r, c
+
+        for count, cell in enumerate(cells):
+            if feedback.isCanceled():
+                return {}
+            points = buckets.pop(cell)
+            for a in range(len(points)):
+                for b in range(a + 1, len(points)):
+                    compare(points[a], points[b])
+            for neighbour in neighbours(cell[0], cell[1]):
+                for i in points:
+                    for j in buckets.get(neighbour, ()):
+                        compare(i, j)
+            feedback.setProgress(50 + 50 * count / len(cells))
+
+        clusters = {}
+        for i in range(len(parents)):
+            clusters.setdefault(find(i), []).append(i)
+
+        fields = QgsFields()
+        fields.append(QgsField('cluster_id', QVariant.Int))
+        fields.append(QgsField('cluster_size', QVariant.Int))
+        fields.append(QgsField('layer', QVariant.String))
+        fields.append(QgsField('feature_id', QVariant.LongLong))
+
+        (sink, dest_id) = self.parameterAsSink(parameters, self.OUTPUT, context,
+                                               fields, QgsWkbTypes.Point, wgs84)
+
+        cluster_id = 0
+        for members in clusters.values():
+            if len(members) < 2:
+                continue
+            cluster_id += 1
+            for i in members:
+                feature = QgsFeature(fields)
+                feature.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(lons[i], lats[i])))
+                feature.setAttributes([cluster_id, len(members), layers[layer_ids[i]].name(), fids[i]])
+                sink.addFeature(feature, QgsFeatureSink.FastInsert)
+
+        feedback.pushInfo(self.tr('{} duplicate clusters found').format(cluster_id))
+        return {self.OUTPUT: dest_id}
+
+    def name(self):
+        return 'nearduplicatepoints'
+
+    def displayName(self):
+        return self.tr('Find near-duplicate points')
+
+    def group(self):
+        return self.tr('Vector analysis')
+
+    def groupId(self):
+        return 'vectoranalysis'
+
+    def shortHelpString(self):
+        return self.tr('Finds points of one or more layers that are closer than the tolerance '
+                       'to each other and outputs them grouped in clusters. Points are bucketed '
+                       'by geohash cell so each point is only compared with the points of its '
+                       'own cell and of the adjacent cells.')
+
+    def tr(self, string):
+        return QCoreApplication.translate('Processing', string)
+
+    def createInstance(self):
+        return NearDuplicatePointsAlgorithm()
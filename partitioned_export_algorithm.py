@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ PartitionedExportAlgorithm
+                                 A QGIS plugin
+ This plugin adds four expression functions to work with geohash
+ Generated by Plugin Builder: http://g-sherman.github.io/Qgis-Plugin-Builder/
+                             -------------------
+        begin                : 2023-12-09
+        git sha              : $Format:%H$
+        copyright            : (C) 2023 by Valentin BUIRA
+        email                : valentin.buira at gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import json
+import os
+from collections import OrderedDict
+
+from qgis.PyQt.QtCore import QCoreApplication
+from qgis.core import (QgsCoordinateReferenceSystem,
+                       QgsCoordinateTransform,
+                       QgsFeatureSink,
+                       QgsProcessingAlgorithm,
+                       QgsProcessingException,
+                       QgsProcessingOutputFile,
+                       QgsProcessingParameterFeatureSource,
+                       QgsProcessingParameterFolderDestination,
+                       QgsProcessingParameterNumber,
+                       QgsVectorFileWriter)
+
+from .geohash import encode, decode_extent
+
+# Hive name of the partition of the features without geometry
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+
+class PartitionedExportAlgorithm(QgsProcessingAlgorithm):
+    """
+    Export a layer to one GeoPackage per geohash prefix, in Hive style
+    directories like gh=u0q/part.gpkg, with a manifest of the partitions.
+
+    Only a bounded number of writers are kept open: the least recently
+    used one is closed when another partition needs a writer, and is
+    reopened in append mode if that partition comes back.
+    """
+
+    INPUT = 'INPUT'
+    PRECISION = 'PRECISION'
+    MAX_OPEN_FILES = 'MAX_OPEN_FILES'
+    OUTPUT = 'OUTPUT'
+    MANIFEST = 'MANIFEST'
+
+    def initAlgorithm(self, config):
+        self.addParameter(
+            QgsProcessingParameterFeatureSource(
+                self.INPUT,
+                self.tr('Input layer')
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.PRECISION,
+                self.tr('Partition precision'),
+                QgsProcessingParameterNumber.Integer,
+                defaultValue=3,
+                minValue=1,
+                maxValue=12
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.MAX_OPEN_FILES,
+                self.tr('Maximum open files'),
+                QgsProcessingParameterNumber.Integer,
+                defaultValue=64,
+                minValue=1
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterFolderDestination(
+                self.OUTPUT,
+                self.tr('Output directory')
+            )
+        )
+
+        self.addOutput(
+            QgsProcessingOutputFile(
+                self.MANIFEST,
+                self.tr('Partition manifest')
+            )
+        )
+
+    def processAlgorithm(self, parameters, context, feedback):
+        source = self.parameterAsSource(parameters, self.INPUT, context)
+        precision = self.parameterAsInt(parameters, self.PRECISION, context)
+        max_open_files = self.parameterAsInt(parameters, self.MAX_OPEN_FILES, context)
+        output_dir = self.parameterAsString(parameters, self.OUTPUT, context)
+
+        transform = QgsCoordinateTransform(source.sourceCrs(),
+                                           QgsCoordinateReferenceSystem('EPSG:4326'),
+                                           context.transformContext())
+
+        os.makedirs(output_dir, exist_ok=True)
+        writers = OrderedDict()
+        counts = {}
+
+        def writer_for(partition):
+            writer = writers.get(partition)
+            if writer is not None:
+                writers.move_to_end(partition)
+                return writer
+            if len(writers) >= max_open_files:
+                # Dropping the last reference closes the file
+                writers.popitem(last=False)
+
+            path = os.path.join(output_dir, 'gh={}'.format(partition), 'part.gpkg')
+            options = QgsVectorFileWriter.SaveVectorOptions()
+            options.driverName = 'GPKG'
+            options.layerName = 'part'
+            if partition in counts:
+                options.actionOnExistingFile = QgsVectorFileWriter.AppendToLayerNoNewFields
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                options.actionOnExistingFile = QgsVectorFileWriter.CreateOrOverwriteFile
+                counts[partition] = 0
+            writer = QgsVectorFileWriter.create(path, source.fields(), source.wkbType(), source.sourceCrs(),
+                                                context.transformContext(), options)
+            if writer.hasError() != QgsVectorFileWriter.NoError:
+                raise QgsProcessingException(writer.errorMessage())
+            writers[partition] = writer
+            return writer
+
+        total = 100.0 / source.featureCount() if source.featureCount() else 0
+        try:
+            for current, feature in enumerate(source.getFeatures()):
+                if feedback.isCanceled():
+                    return {}
+                geometry = feature.geometry()
+                if geometry.isNull():
+                    partition = NULL_PARTITION
+                else:
+                    point = transform.transform(geometry.centroid().asPoint())
+                    partition = encode(point.y(), point.x(), precision=precision)
+                writer_for(partition).addFeature(feature, QgsFeatureSink.FastInsert)
+                counts[partition] += 1
+                feedback.setProgress(int(current * total))
+        finally:
+            writers.clear()
+
+        manifest = []
+        for partition in sorted(counts):
+            item = {
+                'partition': partition,
+                'path': 'gh={}/part.gpkg'.format(partition),
+                'feature_count': counts[partition],
+                'bounds': None,
+            }
+            if partition != NULL_PARTITION:
+                lat_min, lat_max, lon_min, lon_max = decode_extent(partition)
+                item['bounds'] = [lon_min, lat_min, lon_max, lat_max]
+            manifest.append(item)
+
+        manifest_path = os.path.join(output_dir, 'manifest.json')
+        with open(manifest_path, 'w') as f:
+            json.dump({'partition_key': 'gh', 'precision': precision, 'partitions': manifest}, f, indent=2)
+
+        feedback.pushInfo(self.tr('{} partitions written').format(len(manifest)))
+        return {self.OUTPUT: output_dir, self.MANIFEST: manifest_path}
+
+    def name(self):
+        return 'partitionedexport'
+
+    def displayName(self):
+        return self.tr('Export partitioned by geohash')
+
+    def group(self):
+        return self.tr('Vector general')
+
+    def groupId(self):
+        return 'vectorgeneral'
+
+    def shortHelpString(self):
+        return self.tr('Exports a layer to one GeoPackage per geohash prefix of the centroid of the '
+                       'features, in Hive style directories like gh=u0q/part.gpkg, and writes a '
+                       'manifest.json listing the partitions with their feature count and the '
+                       'bounds (lon min, lat min, lon max, lat max) of their cell. At most the '
+                       'given number of files are open at the same time. Features without geometry '
+                       'go to the gh=__HIVE_DEFAULT_PARTITION__ partition.')
+
+    def tr(self, string):
+        return QCoreApplication.translate('Processing', string)
+
+    def createInstance(self):
+        return PartitionedExportAlgorithm()
@@ -1,8 +1,58 @@
 from qgis.core import *
 from qgis.gui import *
 from qgis.core import Qgis
-
-from .geohash import encode, decode, decode_extent, neighbours, neighbours_dict
+from qgis.PyQt.QtCore import (Qt, QCoreApplication, QDate, QDateTime, QObject, QThread, QTime,
+                              pyqtSignal)
+
+import itertools
+import threading
+from functools import partial
+
+from .geohash import (encode, decode_extent, neighbours, neighbours_dict,
+                      encode_path, decode_path, path_from_string, encode_multi,
+                      encode_many, decode_extent_many, neighbours_many, grid_position)
+from .lookup_table import open_table
+from .cell_metrics import cell_area, cell_dimensions, precision_for_distance
+from .dissolve import dissolve
+from .raster_sampling import prepare_raster, raster_band_count, sample_raster
+from .geohash_task import ThinningTask, thin_features
+from .thinning import precision_for_scale
+from .time_key import time_key, split_time_key
+
+# Hash tables built by geohash_aggregate, keyed by
+# (layer id, expression, aggregate, precision) and holding cell -> value
+_aggregate_cache = {}
+_aggregate_watched_layers = set()
+# Feature ids kept by geohash_thin, keyed by (layer id, precision, max points),
+# and the last use of each entry, to drop the least recently used entries
+# once they hold more than MAX_THINNED_IDS ids
+MAX_THINNED_IDS = 5000000
+_thinning_cache = {}
+_thinning_used = {}
+_thinning_clock = itertools.count()
+# Running thinning tasks, and the keys requested by the render threads,
+# keyed like the cache
+_thinning_tasks = {}
+_thinning_requested = set()
+# Snapshots of the layers aggregated by geohash_aggregate, keyed by the
+# layer reference given to the function, None when it is not a vector layer
+_aggregate_layers = {}
+_aggregate_requested = set()
+# Layer ids of the rasters sampled by geohash_raster_sample, keyed by the
+# layer reference given to the function, '' when it is not a raster
+_raster_references = {}
+_raster_requested = set()
+
+_aggregates = {
+    'count': len,
+    'count_distinct': lambda values: len(set(values)),
+    'sum': sum,
+    'mean': lambda values: sum(values) / len(values),
+    'min': min,
+    'max': max,
+    'range': lambda values: max(values) - min(values),
+    'concatenate': lambda values: ','.join(str(value) for value in values),
+}
 
 @qgsfunction(args=-1, group='Geohash')
 def geohash(values, parent):
@@ -138,11 +188,16 @@ def geohash_yx(values, parent):
 
     </p>
 
+    <p>
+    <i>y</i> and <i>x</i> can also be arrays of the same length, the geohashes of all the coordinates are then returned as an array in a single call.
+    </p>
+
     <h4>Example usage</h4>
     <ul>
       <li><b>geohash_yx</b>(-126, 48)  &rarr; 'c0w3hf1s70w3'</li>
       <li><b>geohash_yx</b>(-126, 48, 5)  &rarr; 'c0w3h'</li>
       <li><b>geohash_yx</b>('-126', '48')  &rarr; 'c0w3hf1s70w3'</li>
+      <li><b>geohash_yx</b>(array(-126, 2.35), array(48, 48.85), 5)  &rarr; [ 'c0w3h', 'u09tv' ]</li>
     </ul>
     """
     if len(values) < 2 or len(values) > 3:
@@ -153,6 +208,12 @@ def geohash_yx(values, parent):
     if len(values) == 3:
         precision = int(values[2])
 
+    if isinstance(values[0], list) or isinstance(values[1], list):
+        if not (isinstance(values[0], list) and isinstance(values[1], list)) or len(values[0]) != len(values[1]):
+            parent.setEvalErrorString("Error: y and x must be arrays of the same length")
+            return
+        return encode_many([float(lat) for lat in values[1]], [float(lon) for lon in values[0]], precision=precision)
+
     lat = float(values[1])
     lon = float(values[0])
     geohash = encode(lat , lon, precision=precision)
@@ -166,13 +227,17 @@ def geom_from_geohash(geohash) :
     <p><b>geom_from_geohash</b>( <i>geohash</i> )</p>
 
     <h4>Arguments</h4>
-    <p><i>geohash</i> &rarr; the geohash string.</p>
+    <p><i>geohash</i> &rarr; the geohash string, or an array of geohash strings to get all their bounds collected in a multi polygon in a single call.</p>
 
     <h4>Example usage</h4>
     <ul>
       <li><b>geom_from_geohash</b>('9qqj7nmxncgyy4d0dbxqz0') &rarr; 'Polygon ((-115.172816 36.114646,-115.172816 36.114646,-115.172816 36.114646,-115.172816 36.114646,-115.172816 36.114646))'</li>
+      <li><b>geom_from_geohash</b>(geohash_neighbours('w21z74nz')) &rarr; 'MultiPolygon (...)'</li>
     </ul>
     """
+    if isinstance(geohash, list):
+        return QgsGeometry.collectGeometry([QgsGeometry.fromRect(QgsRectangle(lon_min, lat_min, lon_max, lat_max))
+                                            for lat_min, lat_max, lon_min, lon_max in decode_extent_many(geohash)])
     lat_min, lat_max, lon_min, lon_max  = decode_extent(geohash)
     rect = QgsRectangle(lon_min, lat_min, lon_max, lat_max)
     polygon = QgsGeometry.fromRect(rect)
@@ -186,16 +251,19 @@ def point_from_geohash(geohash):
     <p><b>point_from_geohash</b>( <i>geohash</i> )</p>
 
     <h4>Arguments</h4>
-    <p><i>geohash</i> &rarr; the geohash string.</p>
+    <p><i>geohash</i> &rarr; the geohash string, or an array of geohash strings to get all their center points collected in a multi point in a single call.</p>
 
     <h4>Example usage</h4>
     <ul>
       <li><b>point_from_geohash</b>('9qqj7nmxncgyy4d0dbxqz0') &rarr; 'Point (-115.172816 36.114646)'</li>
+      <li><b>point_from_geohash</b>(array('u09tu', 'u09tv')) &rarr; 'MultiPoint ((2.30712891 48.84521484),(2.35107422 48.84521484))'</li>
     </ul>
     """
-    lat, lon = decode(geohash)
-    lat, lon = float(lat), float(lon)
-    point = QgsGeometry.fromPointXY(QgsPointXY(lat, lon))
+    if isinstance(geohash, list):
+        return QgsGeometry.fromMultiPointXY([QgsPointXY((lon_min + lon_max) / 2, (lat_min + lat_max) / 2)
+                                             for lat_min, lat_max, lon_min, lon_max in decode_extent_many(geohash)])
+    lat_min, lat_max, lon_min, lon_max = decode_extent(geohash)
+    point = QgsGeometry.fromPointXY(QgsPointXY((lon_min + lon_max) / 2, (lat_min + lat_max) / 2))
     return point
 
 @qgsfunction(args='auto', group='Geohash')
@@ -207,16 +275,19 @@ def geohash_neighbours(geohash):
     <p><b>geohash_neighbours</b>( <i>geohash</i> )</p>
 
     <h4>Arguments</h4>
-    <p><i>geohash</i> &rarr; the geohash string.</p>
+    <p><i>geohash</i> &rarr; the geohash string, or an array of geohash strings to get the array of their neighbours arrays in a single call.</p>
 
     <h4>Example usage</h4>
     <ul>
       <li><b>geohash_neighbours</b>('w21z74nz') &rarr; [ 'w21z74qb', 'w21z74r0', 'w21z74nx', 'w21z74pp', 'w21z74nw', 'w21z74ny', 'w21z74pn', 'w21z74q8' ]</li>
+      <li><b>geohash_neighbours</b>(array('w21z74nz', 'w21z74qb'))[0] &rarr; [ 'w21z74qb', 'w21z74r0', 'w21z74nx', 'w21z74pp', 'w21z74nw', 'w21z74ny', 'w21z74pn', 'w21z74q8' ]</li>
     </ul>
 
     <h4>See also</h4>
     <p><i>geohash_neighbours_map</i> function </p>
     """
+    if isinstance(geohash, list):
+        return neighbours_many(geohash)
     return neighbours(geohash)
 
 @qgsfunction(args='auto', group='Geohash')
@@ -479,3 +550,853 @@ def geohash_northwest(geohash):
     return neighbours_dict(geohash)['NW']
 
 
+def _is_null(value):
+    return value is None or value == NULL
+
+def _layer_from_value(value):
+    """
+    Resolve a layer given as a layer object, a layer id or a layer name.
+    """
+    if isinstance(value, QgsMapLayer):
+        return value
+    project = QgsProject.instance()
+    layer = project.mapLayer(str(value))
+    if layer is None:
+        layers = project.mapLayersByName(str(value))
+        layer = layers[0] if layers else None
+    return layer
+
+def _in_main_thread():
+    return QThread.currentThread() == QCoreApplication.instance().thread()
+
+def _is_rendering(context):
+    """
+    Return true if the expression is evaluated to render a map, where
+    waiting for the main thread could deadlock.
+    """
+    return context is not None and not _is_null(context.variable('map_id'))
+
+def _prepare_and_repaint(prepare, reference, requested, repaint_layer_id):
+    prepare(reference)
+    requested.discard(reference)
+    layer = QgsProject.instance().mapLayer(repaint_layer_id) if repaint_layer_id else None
+    if layer is not None:
+        layer.triggerRepaint()
+
+def _prepare_in_main_thread(prepare, reference, requested, context):
+    """
+    Call prepare(reference) in the main thread, which owns the project
+    and the layers. Returns False when the call was queued by a map
+    render instead, the rendered layer is redrawn once it is done.
+    """
+    if _in_main_thread():
+        prepare(reference)
+    elif _is_rendering(context):
+        if reference not in requested:
+            requested.add(reference)
+            _main_thread.queued.emit(partial(_prepare_and_repaint, prepare, reference, requested,
+                                             context.variable('layer_id')))
+        return False
+    else:
+        _main_thread.blocking.emit(partial(prepare, reference))
+    return True
+
+def _store_thinning(key, kept):
+    """
+    Cache the ids kept by a thinning, in the main thread, dropping the
+    least recently used entries over MAX_THINNED_IDS ids.
+    """
+    _thinning_cache[key] = kept
+    _thinning_used[key] = next(_thinning_clock)
+    total = sum(len(ids) for ids in _thinning_cache.values())
+    for old in sorted(_thinning_cache, key=lambda k: _thinning_used.get(k, -1)):
+        if total <= MAX_THINNED_IDS or old == key:
+            break
+        total -= len(_thinning_cache.pop(old))
+        _thinning_used.pop(old, None)
+        # A dropped entry is thinned again on its next use
+        _thinning_requested.discard(old)
+
+def _invalidate_aggregates(layer_id):
+    for cache in (_aggregate_cache, _thinning_cache, _thinning_used):
+        for key in [key for key in cache if key[0] == layer_id]:
+            del cache[key]
+    for reference in [reference for reference, source in _aggregate_layers.items()
+                      if source is not None and source.layer_id == layer_id]:
+        del _aggregate_layers[reference]
+    for key in [key for key in _thinning_tasks if key[0] == layer_id]:
+        _thinning_tasks.pop(key).cancel()
+    _thinning_requested.difference_update([key for key in _thinning_requested if key[0] == layer_id])
+
+def _forget_layer(layer_id):
+    _invalidate_aggregates(layer_id)
+    _aggregate_watched_layers.discard(layer_id)
+
+def _watch_layer(layer):
+    if layer.id() in _aggregate_watched_layers:
+        return
+    _aggregate_watched_layers.add(layer.id())
+    layer.dataChanged.connect(partial(_invalidate_aggregates, layer.id()))
+    layer.willBeDeleted.connect(partial(_forget_layer, layer.id()))
+
+class _AggregateSource:
+    """
+    A snapshot of a layer aggregated by geohash_aggregate, taken in the
+    main thread so its tables can be built from any thread.
+    """
+
+    def __init__(self, layer):
+        self.layer_id = layer.id()
+        self.fields = layer.fields()
+        self.source = QgsVectorLayerFeatureSource(layer)
+        self.context = QgsExpressionContext(QgsExpressionContextUtils.globalProjectLayerScopes(layer))
+        self.transform_context = QgsProject.instance().transformContext()
+        # One table is built at a time from the snapshot
+        self.lock = threading.Lock()
+
+def _prepare_aggregate_layer(reference):
+    layer = _layer_from_value(reference)
+    if isinstance(layer, QgsVectorLayer):
+        _watch_layer(layer)
+        _aggregate_layers[reference] = _AggregateSource(layer)
+    else:
+        _aggregate_layers[reference] = None
+
+def _build_aggregate_table(source, expression, aggregate, precision):
+    """
+    Scan the layer snapshot once and reduce the expression values of its
+    features per geohash cell. Returns a dict cell -> aggregated value.
+    """
+    context = QgsExpressionContext(source.context)
+    exp = QgsExpression(expression)
+    if exp.hasParserError():
+        raise ValueError(exp.parserErrorString())
+    exp.prepare(context)
+
+    request = QgsFeatureRequest()
+    request.setDestinationCrs(QgsCoordinateReferenceSystem('EPSG:4326'), source.transform_context)
+    columns = exp.referencedColumns()
+    if QgsFeatureRequest.ALL_ATTRIBUTES not in columns:
+        request.setSubsetOfAttributes(columns, source.fields)
+
+    cell_values = {}
+    for feature in source.source.getFeatures(request):
+        geometry = feature.geometry()
+        if geometry.isNull():
+            continue
+        context.setFeature(feature)
+        value = exp.evaluate(context)
+        point = geometry.centroid().asPoint()
+        cell = encode(point.y(), point.x(), precision=precision)
+        cell_values.setdefault(cell, []).append(value)
+
+    reduce = _aggregates[aggregate]
+    table = {}
+    for cell, values in cell_values.items():
+        values = [value for value in values if not _is_null(value)]
+        if values:
+            try:
+                table[cell] = reduce(values)
+            except TypeError:
+                raise ValueError('cannot compute the {} of non numeric values'.format(aggregate))
+        elif aggregate in ('count', 'count_distinct'):
+            table[cell] = 0
+    return table
+
+@qgsfunction(args=-1, group='Geohash')
+def geohash_aggregate(values, feature, parent, context):
+    """
+    Aggregate the values of an expression over the features of another layer that fall in the same GeoHash cell.
+    
+    <p>
+    The other layer is scanned only once: a table from cell to aggregated value is built on the first call and kept in memory for the next ones, so each evaluation is a single lookup. The table is dropped when the data of the layer changes.
+    The cell of a feature of the aggregated layer is the cell of its centroid.
+    </p>
+    <p>
+    When a map is rendered in the background, the function returns NULL until the layer is ready to be aggregated, then the rendered layer is redrawn.
+    </p>
+
+    <h4>Syntax</h4>
+    <p><b>geohash_aggregate</b>( <i>layer, expression, aggregate, geohash, precision</i> )</p>
+
+    <h4>Arguments</h4>
+    <p><i>layer</i> &rarr; the layer to aggregate, as a layer, a layer id or a layer name.</p>
+    <p><i>expression</i> &rarr; the expression to aggregate, evaluated on the features of <i>layer</i>.</p>
+    <p><i>aggregate</i> &rarr; one of 'count', 'count_distinct', 'sum', 'mean', 'min', 'max', 'range', 'concatenate'.</p>
+    <p><i>geohash</i> &rarr; the geohash string of the cell to look up. Only its first <i>precision</i> characters are used.</p>
+    <p><i>precision</i> &rarr; the precision of the cells used to group the features of <i>layer</i>.</p>
+
+    <h4>Example usage</h4>
+    <ul>
+      <li><b>geohash_aggregate</b>('buildings', '"height"', 'max', geohash($geometry), 6) &rarr; 32.5</li>
+      <li><b>geohash_aggregate</b>(@layer_b, '1', 'count', geohash($geometry, 7), 7) &rarr; 12</li>
+    </ul>
+    """
+    if len(values) != 5:
+        parent.setEvalErrorString("Error: invalid number of arguments")
+        return
+
+    # The layer is looked up, watched and snapshotted in the main thread,
+    # the table is built from the snapshot in the calling thread
+    reference = values[0].id() if isinstance(values[0], QgsMapLayer) else str(values[0])
+    if reference not in _aggregate_layers:
+        if not _prepare_in_main_thread(_prepare_aggregate_layer, reference, _aggregate_requested, context):
+            return
+    source = _aggregate_layers.get(reference)
+    if source is None:
+        parent.setEvalErrorString("Error: cannot find vector layer {}".format(values[0]))
+        return
+
+    expression = str(values[1])
+    aggregate = str(values[2]).lower()
+    if aggregate not in _aggregates:
+        parent.setEvalErrorString("Error: unknown aggregate {}".format(values[2]))
+        return
+
+    if _is_null(values[3]):
+        return
+    geohash = str(values[3])
+    precision = int(values[4])
+
+    key = (source.layer_id, expression, aggregate, precision)
+    table = _aggregate_cache.get(key)
+    if table is None:
+        with source.lock:
+            table = _aggregate_cache.get(key)
+            if table is None:
+                try:
+                    table = _build_aggregate_table(source, expression, aggregate, precision)
+                except ValueError as e:
+                    parent.setEvalErrorString("Error: {}".format(e))
+                    return
+                # Tables of a snapshot invalidated meanwhile are not kept
+                if _aggregate_layers.get(reference) is source:
+                    _aggregate_cache[key] = table
+
+    if aggregate in ('count', 'count_distinct'):
+        return table.get(geohash[:precision], 0)
+    return table.get(geohash[:precision])
+
+
+def _line_parts(geometry):
+    """
+    Return the parts of a line geometry as lists of (latitude, longitude).
+    """
+    if geometry.isMultipart():
+        polylines = geometry.asMultiPolyline()
+    else:
+        polylines = [geometry.asPolyline()]
+    return [[(point.y(), point.x()) for point in polyline] for polyline in polylines]
+
+def line_to_geohash_path(geometry, precision):
+    """
+    Encode a line geometry to a list of [geohash, count], the parts of
+    a multi line are encoded one after the other.
+    """
+    runs = []
+    for part in _line_parts(geometry):
+        for run in encode_path(part, precision):
+            if runs and runs[-1][0] == run[0]:
+                runs[-1][1] += run[1]
+            else:
+                runs.append(run)
+    return runs
+
+def geohash_path_to_line(path):
+    """
+    Rebuild a simplified line geometry from a geohash path given as a
+    list of [geohash, count], a list of geohashes or its text form.
+    """
+    if isinstance(path, str):
+        path = path_from_string(path)
+    geohashes = [item[0] if isinstance(item, (list, tuple)) else item for item in path]
+    points = [QgsPointXY(lon, lat) for lat, lon in decode_path(geohashes)]
+    if len(points) == 1:
+        return QgsGeometry.fromPointXY(points[0])
+    return QgsGeometry.fromPolylineXY(points)
+
+@qgsfunction(args=-1, group='Geohash')
+def geohash_path(values, parent):
+    """
+    Return the ordered sequence of the GeoHash cells a line passes through.
+    
+    <p>
+    Consecutive repeats are collapsed: each item of the returned array is a [geohash, count] array where count is the number of vertices of the line in that cell, 0 for the cells the line only crosses.
+    The cells are walked from one to the next, the interpolated positions of the line are never encoded.
+    </p>
+
+    <h4>Syntax</h4>
+    <p><b>geohash_path</b>( <i>geometry[, precision=12]</i> )</p>
+
+    <h4>Arguments</h4>
+    <p><i>geometry</i> &rarr; a line geometry</p>
+    <p><i>precision</i> &rarr; optional precision as characters count. Default value is 12 if not specified.</p>
+
+    <h4>Example usage</h4>
+    <ul>
+      <li><b>geohash_path</b>(geom_from_wkt('LineString (2.29 48.85, 2.30 48.85, 2.33 48.86)'), 5) &rarr; [ [ 'u09tu', 2 ], [ 'u09tv', 1 ] ]</li>
+    </ul>
+    <h4>See also</h4>
+    <p><i>geom_from_geohash_path</i> function </p>
+    """
+    if len(values) < 1 or len(values) > 2:
+        parent.setEvalErrorString("Error: invalid number of arguments")
+        return
+
+    precision = 12
+    if len(values) == 2:
+        precision = int(values[1])
+
+    geometry = values[0]
+    if geometry.type() != QgsWkbTypes.LineGeometry:
+        parent.setEvalErrorString("Error: geometry is not a line")
+        return
+    return line_to_geohash_path(geometry, precision)
+
+@qgsfunction(args='auto', group='Geohash')
+def geom_from_geohash_path(path):
+    """
+    Return a simplified line from a GeoHash path. The line joins the centers of the cells of the path where it changes direction.
+    <h4>Syntax</h4>
+    <p><b>geom_from_geohash_path</b>( <i>path</i> )</p>
+
+    <h4>Arguments</h4>
+    <p><i>path</i> &rarr; a path as returned by geohash_path, an array of geohash strings or a text like 'u09tu:2,u09tv:1'.</p>
+
+    <h4>Example usage</h4>
+    <ul>
+      <li><b>geom_from_geohash_path</b>(array('u09tu', 'u09tv')) &rarr; 'LineString (2.30712891 48.84521484,2.35107422 48.84521484)'</li>
+    </ul>
+    <h4>See also</h4>
+    <p><i>geohash_path</i> function </p>
+    """
+    return geohash_path_to_line(path)
+
+@qgsfunction(args='auto', group='Geohash')
+def geohash_multi(geometry, precisions):
+    """
+    Calculate the <a href="http://en.wikipedia.org/wiki/Geohash">GeoHash</a> of a geometry at several precisions at once, the coordinates used to calculate the geohashes are the coordinates of the centroid of the geometry.
+    
+    <p>
+    The geometry is encoded only once at the finest precision, the other geohashes are its prefixes. Faster than calling geohash several times.
+    </p>
+
+    <h4>Syntax</h4>
+    <p><b>geohash_multi</b>( <i>geometry, precisions</i> )</p>
+
+    <h4>Arguments</h4>
+    <p><i>geometry</i> &rarr; a geometry</p>
+    <p><i>precisions</i> &rarr; an array of precisions as characters count.</p>
+
+    <h4>Example usage</h4>
+    <ul>
+      <li><b>geohash_multi</b>(make_point(-126, 48), array(5, 7, 9)) &rarr; { '5': 'c0w3h', '7': 'c0w3hf1', '9': 'c0w3hf1s7' }</li>
+      <li><b>geohash_multi</b>($geometry, array(5, 7, 9))[<b>'7'</b>] &rarr; 'spezef7'</li>
+    </ul>
+    """
+    if not isinstance(precisions, (list, tuple)):
+        precisions = [precisions]
+    precisions = [int(precision) for precision in precisions]
+    point = geometry.centroid().asPoint()
+    geohashes = encode_multi(point.y(), point.x(), precisions)
+    return {str(precision): geohash for precision, geohash in geohashes.items()}
+
+@qgsfunction(args=-1, group='Geohash')
+def geohash_lookup(values, parent):
+    """
+    Return the value of a GeoHash cell in a lookup table file built with the "Build geohash lookup table" algorithm.
+    
+    <p>
+    The table is mapped in memory and searched with a binary search, it is never loaded: tables of tens of millions of cells are opened instantly and share their memory between QGIS processes. The file is opened once and kept open until it is modified.
+    </p>
+
+    <h4>Syntax</h4>
+    <p><b>geohash_lookup</b>( <i>path, geohash[, default=NULL]</i> )</p>
+
+    <h4>Arguments</h4>
+    <p><i>path</i> &rarr; the path of the lookup table file.</p>
+    <p><i>geohash</i> &rarr; the geohash string. Geohashes longer than the precision of the table are truncated.</p>
+    <p><i>default</i> &rarr; optional value returned when the cell is not in the table.</p>
+
+    <h4>Example usage</h4>
+    <ul>
+      <li><b>geohash_lookup</b>('/data/population_8.ghl', geohash($geometry, 8)) &rarr; 1254.0</li>
+      <li><b>geohash_lookup</b>('/data/population_8.ghl', 'zzzzzzzz', 0) &rarr; 0</li>
+    </ul>
+    """
+    if len(values) < 2 or len(values) > 3:
+        parent.setEvalErrorString("Error: invalid number of arguments")
+        return
+
+    default = values[2] if len(values) == 3 else None
+    if _is_null(values[1]):
+        return default
+
+    try:
+        table = open_table(str(values[0]))
+    except (OSError, ValueError) as e:
+        parent.setEvalErrorString("Error: {}".format(e))
+        return
+    return table.get(str(values[1]), default)
+
+@qgsfunction(args='auto', group='Geohash')
+def geohash_cell_area(geohash):
+    """
+    Return the area in square meters of a GeoHash cell on the WGS84 ellipsoid.
+    
+    <p>
+    The area only depends on the precision and on the latitude band of the cell, it is read from tables computed once instead of measuring the cell polygon. It is within 0.1 % of the ellipsoidal area of geom_from_geohash for precisions 3 and finer.
+    </p>
+
+    <h4>Syntax</h4>
+    <p><b>geohash_cell_area</b>( <i>geohash</i> )</p>
+
+    <h4>Arguments</h4>
+    <p><i>geohash</i> &rarr; the geohash string.</p>
+
+    <h4>Example usage</h4>
+    <ul>
+      <li><b>round</b>(<b>geohash_cell_area</b>('u09tv')) &rarr; 15763113</li>
+    </ul>
+    <h4>See also</h4>
+    <p><i>geohash_cell_size</i> function </p>
+    """
+    return cell_area(geohash)
+
+@qgsfunction(args='auto', group='Geohash')
+def geohash_cell_size(geohash):
+    """
+    Return a map with the width and the height in meters of a GeoHash cell on the WGS84 ellipsoid. The width is measured along the parallel at the middle of the cell.
+    
+    <p>
+    The size only depends on the precision and on the latitude band of the cell, it is read from tables computed once. It is within 1 mm of the ellipsoidal lengths for precisions 5 and finer.
+    </p>
+
+    <h4>Syntax</h4>
+    <p><b>geohash_cell_size</b>( <i>geohash</i> )</p>
+
+    <h4>Arguments</h4>
+    <p><i>geohash</i> &rarr; the geohash string.</p>
+
+    <h4>Example usage</h4>
+    <ul>
+      <li><b>geohash_cell_size</b>('u09tv') &rarr; { 'height': 4887.01, 'width': 3225.51 }</li>
+      <li><b>geohash_cell_size</b>('u09tv')[<b>'width'</b>] &rarr; 3225.51</li>
+    </ul>
+    <h4>See also</h4>
+    <p><i>geohash_cell_area</i> function </p>
+    """
+    width, height = cell_dimensions(geohash)
+    return {'width': width, 'height': height}
+
+@qgsfunction(args=-1, group='Geohash')
+def geohash_precision_for_distance(values, parent):
+    """
+    Return the finest GeoHash precision whose cells are at least a given distance wide and high at a latitude, so that two points closer than the distance are always in the same or in adjacent cells.
+
+    <h4>Syntax</h4>
+    <p><b>geohash_precision_for_distance</b>( <i>distance[, latitude=0]</i> )</p>
+
+    <h4>Arguments</h4>
+    <p><i>distance</i> &rarr; the distance in meters.</p>
+    <p><i>latitude</i> &rarr; optional latitude of the cells, cells get narrower toward the poles. Default value is 0 if not specified.</p>
+
+    <h4>Example usage</h4>
+    <ul>
+      <li><b>geohash_precision_for_distance</b>(100) &rarr; 7</li>
+      <li><b>geohash_precision_for_distance</b>(100, 60) &rarr; 6</li>
+    </ul>
+    """
+    if len(values) < 1 or len(values) > 2:
+        parent.setEvalErrorString("Error: invalid number of arguments")
+        return
+
+    latitude = 0.0
+    if len(values) == 2:
+        latitude = float(values[1])
+    return precision_for_distance(float(values[0]), latitude)
+
+def geohashes_to_multipolygon(geohashes):
+    """
+    Dissolve geohash cells into a multi polygon geometry in EPSG:4326.
+    """
+    polygons = [[[QgsPointXY(lon, lat) for lon, lat in ring] for ring in polygon]
+                for polygon in dissolve(geohashes)]
+    return QgsGeometry.fromMultiPolygonXY(polygons)
+
+@qgsfunction(args=-1, group='Geohash')
+def geohash_dissolve(values, parent):
+    """
+    Merge GeoHash cells into their outline, a multi polygon with holes. The cells can be of mixed precisions.
+    
+    <p>
+    The cells are merged by the topology of the grid: the edges shared by two cells cancel out and the remaining edges are traced into rings. Much faster than unaryUnion over geom_from_geohash for large sets of cells, and the polygons are always valid.
+    </p>
+
+    <h4>Syntax</h4>
+    <p><b>geohash_dissolve</b>( <i>cells</i> )</p>
+
+    <h4>Arguments</h4>
+    <p><i>cells</i> &rarr; an array of geohash strings.</p>
+
+    <h4>Example usage</h4>
+    <ul>
+      <li><b>geom_to_wkt</b>(<b>geohash_dissolve</b>(array('u09tu', 'u09tv'))) &rarr; 'MultiPolygon (((2.373046875 48.8671875, 2.28515625 48.8671875, 2.28515625 48.8232421875, 2.373046875 48.8232421875, 2.373046875 48.8671875)))'</li>
+      <li><b>geohash_dissolve</b>(array_agg(geohash($geometry, 7))) &rarr; the outline of the cells of all the features</li>
+    </ul>
+    <h4>See also</h4>
+    <p><i>geom_from_geohash</i> function </p>
+    """
+    if len(values) != 1:
+        parent.setEvalErrorString("Error: invalid number of arguments")
+        return
+
+    cells = values[0]
+    if not isinstance(cells, (list, tuple)):
+        cells = [cells]
+    cells = [str(cell).lower() for cell in cells if not _is_null(cell)]
+    for cell in cells:
+        try:
+            grid_position(cell)
+        except KeyError:
+            parent.setEvalErrorString("Error: invalid geohash {}".format(cell))
+            return
+    return geohashes_to_multipolygon(cells)
+
+def _prepare_raster_reference(reference):
+    layer = _layer_from_value(reference)
+    if isinstance(layer, QgsRasterLayer):
+        prepare_raster(layer, QgsProject.instance().transformContext())
+        _raster_references[reference] = layer.id()
+    else:
+        _raster_references[reference] = ''
+
+@qgsfunction(args=-1, group='Geohash')
+def geohash_raster_sample(values, feature, parent, context):
+    """
+    Return the value of a raster band at the center of a GeoHash cell.
+    
+    <p>
+    The raster is read by blocks of 256 x 256 pixels kept in a cache, so the cells of a same area share one block read, and the sampled values are cached by raster, band and geohash. Sampling millions of points that fall in the same cells only reads each cell once.
+    </p>
+    <p>
+    When a map is rendered in the background, the function returns NULL until the raster is opened for sampling, then the layer is redrawn.
+    </p>
+
+    <h4>Syntax</h4>
+    <p><b>geohash_raster_sample</b>( <i>raster_layer, geohash[, band=1]</i> )</p>
+
+    <h4>Arguments</h4>
+    <p><i>raster_layer</i> &rarr; a raster layer, by layer name or layer id.</p>
+    <p><i>geohash</i> &rarr; the geohash string.</p>
+    <p><i>band</i> &rarr; optional band number. Default value is 1 if not specified.</p>
+
+    <h4>Example usage</h4>
+    <ul>
+      <li><b>geohash_raster_sample</b>('dem', geohash($geometry, 8)) &rarr; 35.2</li>
+      <li><b>geohash_raster_sample</b>('landcover', 'u09tvw0f', 1) &rarr; 111</li>
+    </ul>
+    """
+    if len(values) < 2 or len(values) > 3:
+        parent.setEvalErrorString("Error: invalid number of arguments")
+        return
+
+    # The project, the layers and their data providers belong to the main
+    # thread, the raster is prepared there then sampled from any thread
+    reference = values[0].id() if isinstance(values[0], QgsMapLayer) else str(values[0])
+    layer_id = _raster_references.get(reference)
+    if layer_id is None or (layer_id and raster_band_count(layer_id) is None):
+        if not _prepare_in_main_thread(_prepare_raster_reference, reference, _raster_requested, context):
+            return
+        layer_id = _raster_references.get(reference)
+    if not layer_id:
+        parent.setEvalErrorString("Error: {} is not a raster layer".format(values[0]))
+        return
+    if _is_null(values[1]):
+        return
+
+    band = 1
+    if len(values) == 3:
+        band = int(values[2])
+    band_count = raster_band_count(layer_id)
+    if band_count is None:
+        # The raster changed since it was prepared
+        return
+    if band < 1 or band > band_count:
+        parent.setEvalErrorString("Error: invalid band {}".format(band))
+        return
+
+    try:
+        return sample_raster(layer_id, band, str(values[1]).lower())
+    except (KeyError, ValueError) as e:
+        parent.setEvalErrorString("Error: {}".format(e))
+        return
+
+@qgsfunction(args=-1, group='Geohash')
+def geohash_thin(values, feature, parent, context):
+    """
+    Return true if the feature is one of the at most max_points features kept in its GeoHash cell, to thin dense point layers for display. Meant for the filter of a rule based renderer.
+    
+    <p>
+    When the precision is not given it is picked from the map scale, so that cells are about 16 pixels wide. The layer is thinned in a single pass with reservoir sampling on the first call for a precision, and the kept features are cached per precision: zooming back to a scale already seen does not thin the layer again. The cache is dropped when the data of the layer changes.
+    </p>
+    <p>
+    The kept features are held as the kept or the dropped feature ids, whichever are fewer, and the least recently used precisions are dropped from the cache when it gets large.
+    </p>
+    <p>
+    When the map is rendered in the background, the layer is thinned in a background task and the function returns false until the task is done, then the layer is redrawn.
+    </p>
+
+    <h4>Syntax</h4>
+    <p><b>geohash_thin</b>( <i>max_points[, precision]</i> )</p>
+
+    <h4>Arguments</h4>
+    <p><i>max_points</i> &rarr; the maximum number of features kept per cell.</p>
+    <p><i>precision</i> &rarr; optional precision of the cells. Default value is picked from the map scale if not specified.</p>
+
+    <h4>Example usage</h4>
+    <ul>
+      <li><b>geohash_thin</b>(5) &rarr; true for at most 5 features per cell of a precision adapted to the map scale</li>
+      <li><b>geohash_thin</b>(1, 6) &rarr; true for one feature per cell of precision 6</li>
+    </ul>
+    """
+    if len(values) < 1 or len(values) > 2:
+        parent.setEvalErrorString("Error: invalid number of arguments")
+        return
+
+    max_points = int(values[0])
+    if max_points < 1:
+        parent.setEvalErrorString("Error: max_points must be at least 1")
+        return
+    if len(values) == 2:
+        precision = int(values[1])
+    else:
+        scale = context.variable('map_scale') if context else None
+        if _is_null(scale):
+            parent.setEvalErrorString("Error: no map scale, the precision must be given")
+            return
+        precision = precision_for_scale(float(scale))
+
+    layer_id = context.variable('layer_id') if context else None
+    if _is_null(layer_id) or not layer_id:
+        parent.setEvalErrorString("Error: no current layer")
+        return
+
+    key = (str(layer_id), precision, max_points)
+    kept = _thinning_cache.get(key)
+    if kept is not None:
+        # Read by the render threads, a single dict store is thread safe
+        _thinning_used[key] = next(_thinning_clock)
+        return feature.id() in kept
+
+    if QThread.currentThread() != QCoreApplication.instance().thread():
+        # The layer and the project belong to the main thread, the
+        # dispatcher thins the layer in a task and redraws it when done
+        if key not in _thinning_requested:
+            _thinning_requested.add(key)
+            _thinning_dispatcher.requested.emit(*key)
+        return False
+
+    layer = QgsProject.instance().mapLayer(key[0])
+    if not isinstance(layer, QgsVectorLayer):
+        parent.setEvalErrorString("Error: no current layer")
+        return
+    _watch_layer(layer)
+    kept = thin_features(layer, precision, max_points, QgsProject.instance().transformContext())
+    _store_thinning(key, kept)
+    return feature.id() in kept
+
+
+class _ThinningDispatcher(QObject):
+    """
+    Thin layers for geohash_thin on request of the render threads.
+
+    The dispatcher lives in the main thread, the requests emitted from
+    other threads are queued to it, so the layers are only looked up,
+    watched and snapshotted by the main thread.
+    """
+
+    requested = pyqtSignal(str, int, int)
+
+    def __init__(self):
+        super().__init__()
+        self.requested.connect(self.start)
+
+    def start(self, layer_id, precision, max_points):
+        key = (layer_id, precision, max_points)
+        if key in _thinning_cache or key in _thinning_tasks:
+            return
+        layer = QgsProject.instance().mapLayer(layer_id)
+        if not isinstance(layer, QgsVectorLayer):
+            _thinning_requested.discard(key)
+            return
+        _watch_layer(layer)
+        task = _thinning_tasks[key] = ThinningTask(layer, precision, max_points)
+        task.taskCompleted.connect(partial(self.completed, key, task))
+        task.taskTerminated.connect(partial(self.terminated, key, task))
+        QgsApplication.taskManager().addTask(task)
+
+    def completed(self, key, task):
+        # Tasks of invalidated keys were already removed
+        if _thinning_tasks.get(key) is not task:
+            return
+        del _thinning_tasks[key]
+        _store_thinning(key, task.kept)
+        _thinning_requested.discard(key)
+        layer = QgsProject.instance().mapLayer(key[0])
+        if layer is not None:
+            layer.triggerRepaint()
+
+    def terminated(self, key, task):
+        # The key stays requested so a failing layer is not thinned again
+        # on every redraw, until its data changes
+        if _thinning_tasks.get(key) is task:
+            del _thinning_tasks[key]
+
+
+class _MainThreadCall(QObject):
+    """
+    Call functions in the main thread on behalf of other threads, queued
+    or waiting for the call to return.
+    """
+
+    queued = pyqtSignal(object)
+    blocking = pyqtSignal(object)
+
+    def __init__(self):
+        super().__init__()
+        self.queued.connect(self.call)
+        self.blocking.connect(self.call, Qt.ConnectionType.BlockingQueuedConnection)
+        # Layers added later can make unresolved references valid
+        QgsProject.instance().layersAdded.connect(self.layers_added)
+
+    def call(self, function):
+        try:
+            function()
+        except Exception as e:
+            QgsMessageLog.logMessage(str(e), 'Geohash', Qgis.Warning)
+
+    def layers_added(self, layers):
+        for reference in [reference for reference, layer_id in _raster_references.items() if not layer_id]:
+            del _raster_references[reference]
+        for reference in [reference for reference, source in _aggregate_layers.items() if source is None]:
+            del _aggregate_layers[reference]
+
+
+# Created on import, by the main thread
+_thinning_dispatcher = _ThinningDispatcher()
+_main_thread = _MainThreadCall()
+
+def datetime_to_seconds(value):
+    """
+    Return the seconds since the Unix epoch of a date, a date time or an
+    ISO 8601 text.
+    """
+    if isinstance(value, QDate):
+        value = QDateTime(value, QTime(0, 0))
+    elif isinstance(value, str):
+        value = QDateTime.fromString(value, Qt.DateFormat.ISODate)
+    if not isinstance(value, QDateTime) or not value.isValid():
+        raise ValueError('invalid date time {}'.format(value))
+    return value.toMSecsSinceEpoch() / 1000
+
+def interval_to_seconds(value):
+    """
+    Return the length in seconds of an interval, a number of seconds or
+    a text like '15 minutes'.
+    """
+    if isinstance(value, str):
+        interval = QgsInterval.fromString(value)
+        value = interval if interval.isValid() else float(value)
+    seconds = value.seconds() if isinstance(value, QgsInterval) else float(value)
+    if seconds <= 0:
+        raise ValueError('the interval must be positive')
+    return seconds
+
+@qgsfunction(args=-1, group='Geohash')
+def geohash_time_key(values, parent):
+    """
+    Return a composite space-time bucket key: a sortable integer combining the time window of a date time and the GeoHash cell of a geometry.
+    
+    <p>
+    The key is the index of the time window, counted in intervals from 1970-01-01 UTC, followed by the bits of the geohash. Keys sort by time window then by cell and are grouped on much faster than concatenated texts. The key must fit in 64 bits, which leaves 63 - 5 * precision bits for the time window: with an interval of one minute the precision can be up to 7.
+    </p>
+
+    <h4>Syntax</h4>
+    <p><b>geohash_time_key</b>( <i>geometry_or_yx, precision, datetime, interval</i> )</p>
+
+    <h4>Arguments</h4>
+    <p><i>geometry_or_yx</i> &rarr; a geometry, the centroid is used, or an array of the y and x (latitude and longitude) coordinates.</p>
+    <p><i>precision</i> &rarr; precision of the geohash as characters count.</p>
+    <p><i>datetime</i> &rarr; the date time of the event.</p>
+    <p><i>interval</i> &rarr; the length of the time windows, as an interval, a number of seconds or a text like '15 minutes'.</p>
+
+    <h4>Example usage</h4>
+    <ul>
+      <li><b>geohash_time_key</b>(make_point(2.35, 48.85), 5, to_datetime('2025-10-09T08:53:20Z'), '1 hour') &rarr; 16404386424635</li>
+      <li><b>geohash_time_key</b>(array(48.85, 2.35), 7, "timestamp", 60) &rarr; 1007885675268992607</li>
+    </ul>
+    <h4>See also</h4>
+    <p><i>geohash_time_key_split</i> function </p>
+    """
+    if len(values) != 4:
+        parent.setEvalErrorString("Error: invalid number of arguments")
+        return
+    if any(_is_null(value) for value in values):
+        return
+
+    location, precision = values[0], int(values[1])
+    if isinstance(location, QgsGeometry):
+        point = location.centroid().asPoint()
+        lat, lon = point.y(), point.x()
+    elif isinstance(location, (list, tuple)) and len(location) == 2:
+        lat, lon = float(location[0]), float(location[1])
+    else:
+        parent.setEvalErrorString("Error: the location must be a geometry or an array of y, x")
+        return
+
+    try:
+        return time_key(encode(lat, lon, precision=precision),
+                        datetime_to_seconds(values[2]), interval_to_seconds(values[3]))
+    except ValueError as e:
+        parent.setEvalErrorString("Error: {}".format(e))
+        return
+
+@qgsfunction(args=-1, group='Geohash')
+def geohash_time_key_split(values, parent):
+    """
+    Return a map with the GeoHash cell and the start and end, in UTC, of the time window of a space-time key built by geohash_time_key.
+
+    <h4>Syntax</h4>
+    <p><b>geohash_time_key_split</b>( <i>key, precision, interval</i> )</p>
+
+    <h4>Arguments</h4>
+    <p><i>key</i> &rarr; the space-time key.</p>
+    <p><i>precision</i> &rarr; precision of the geohash used to build the key.</p>
+    <p><i>interval</i> &rarr; the length of the time windows used to build the key.</p>
+
+    <h4>Example usage</h4>
+    <ul>
+      <li><b>geohash_time_key_split</b>(16404386424635, 5, '1 hour')[<b>'geohash'</b>] &rarr; 'u09tv'</li>
+      <li><b>geohash_time_key_split</b>(16404386424635, 5, '1 hour')[<b>'start'</b>] &rarr; 2025-10-09T08:00:00Z</li>
+    </ul>
+    <h4>See also</h4>
+    <p><i>geohash_time_key</i> function </p>
+    """
+    if len(values) != 3:
+        parent.setEvalErrorString("Error: invalid number of arguments")
+        return
+    if _is_null(values[0]):
+        return
+
+    try:
+        interval = interval_to_seconds(values[2])
+    except ValueError as e:
+        parent.setEvalErrorString("Error: {}".format(e))
+        return
+    geohash, start = split_time_key(int(values[0]), int(values[1]), interval)
+    return {
+        'geohash': geohash,
+        'start': QDateTime.fromMSecsSinceEpoch(int(start * 1000), Qt.TimeSpec.UTC),
+        'end': QDateTime.fromMSecsSinceEpoch(int((start + interval) * 1000), Qt.TimeSpec.UTC),
+    }
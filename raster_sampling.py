@@ -0,0 +1,198 @@
+"""
+Raster sampling at the center of geohash cells.
+
+Values are read from blocks of BLOCK_SIZE x BLOCK_SIZE pixels aligned on
+the pixel grid of the raster, kept in a small LRU cache, so neighbouring
+cells share one provider block read instead of sampling the provider once
+per cell. The sampled values are kept in a bounded LRU cache keyed by
+(layer id, band, geohash).
+
+Raster data providers cannot be shared between threads: the layers are
+prepared in the main thread, and every thread sampling them reads
+through its own provider clone and block cache.
+"""
+import threading
+from collections import OrderedDict
+from functools import partial
+from math import floor
+
+from qgis.core import (QgsCoordinateReferenceSystem,
+                       QgsCoordinateTransform,
+                       QgsCsException,
+                       QgsPointXY,
+                       QgsRectangle)
+
+from .geohash import decode_extent
+
+BLOCK_SIZE = 256
+MAX_BLOCKS = 64
+MAX_VALUES = 100000
+
+# Rasters prepared in the main thread, keyed by layer id
+_sources = {}
+# Sampled values keyed by (layer id, band, geohash)
+_values = OrderedDict()
+_watched_layers = set()
+# Guards _sources and _values, sampled from the render threads
+_lock = threading.Lock()
+# Samplers of each thread, keyed by (layer id, band)
+_threads = threading.local()
+
+
+class _RasterSource:
+    """
+    A clone of the data provider of a raster layer, made in the main
+    thread, from which each sampling thread clones its own provider.
+    """
+
+    def __init__(self, provider, band_count, transform_context):
+        self._provider = provider
+        self.band_count = band_count
+        self.transform_context = transform_context
+        self._clone_lock = threading.Lock()
+
+    def clone(self):
+        with self._clone_lock:
+            return self._provider.clone()
+
+
+class RasterBlockSampler:
+    """
+    Sample one band of a raster data provider at WGS84 coordinates
+    through a cache of aligned pixel blocks.
+    """
+
+    def __init__(self, provider, band, transform_context, max_blocks=MAX_BLOCKS):
+        self.provider = provider
+        self.band = band
+        self.max_blocks = max_blocks
+        self.transform = QgsCoordinateTransform(QgsCoordinateReferenceSystem('EPSG:4326'),
+                                                provider.crs(), transform_context)
+        self.extent = provider.extent()
+        self.width = provider.xSize()
+        self.height = provider.ySize()
+        if not self.width or not self.height:
+            raise ValueError('the raster has no fixed pixel size')
+        self.x_resolution = self.extent.width() / self.width
+        self.y_resolution = self.extent.height() / self.height
+        self._blocks = OrderedDict()
+
+    def _block(self, block_row, block_col):
+        key = (block_row, block_col)
+        block = self._blocks.get(key)
+        if block is not None:
+            self._blocks.move_to_end(key)
+            return block
+        if len(self._blocks) >= self.max_blocks:
+            self._blocks.popitem(last=False)
+
+        col_min = block_col * BLOCK_SIZE
+        row_min = block_row * BLOCK_SIZE
+        cols = min(BLOCK_SIZE, self.width - col_min)
+        rows = min(BLOCK_SIZE, self.height - row_min)
+        x_min = self.extent.xMinimum() + col_min * self.x_resolution
+        y_max = self.extent.yMaximum() - row_min * self.y_resolution
+        extent = QgsRectangle(x_min, y_max - rows * self.y_resolution, x_min + cols * self.x_resolution, y_max)
+        block = self._blocks[key] = self.provider.block(self.band, extent, cols, rows)
+        return block
+
+    def sample(self, lat, lon):
+        """
+        Return the value of the pixel at the coordinates, or None when it
+        is outside of the raster or nodata.
+        """
+        try:
+            point = self.transform.transform(QgsPointXY(lon, lat))
+        except QgsCsException:
+            return None
+        col = floor((point.x() - self.extent.xMinimum()) / self.x_resolution)
+        row = floor((self.extent.yMaximum() - point.y()) / self.y_resolution)
+        if not (0 <= col < self.width and 0 <= row < self.height):
+            return None
+        block = self._block(row // BLOCK_SIZE, col // BLOCK_SIZE)
+        if not block.isValid() or block.isNoData(row % BLOCK_SIZE, col % BLOCK_SIZE):
+            return None
+        return block.value(row % BLOCK_SIZE, col % BLOCK_SIZE)
+
+    def sample_geohash(self, geohash):
+        """
+        Return the value of the pixel at the center of the geohash cell.
+        """
+        lat_min, lat_max, lon_min, lon_max = decode_extent(geohash)
+        return self.sample((lat_min + lat_max) / 2, (lon_min + lon_max) / 2)
+
+
+def _forget_layer(layer_id):
+    with _lock:
+        _sources.pop(layer_id, None)
+        for key in [key for key in _values if key[0] == layer_id]:
+            del _values[key]
+
+def _delete_layer(layer_id):
+    _forget_layer(layer_id)
+    _watched_layers.discard(layer_id)
+
+def _watch_layer(layer):
+    if layer.id() in _watched_layers:
+        return
+    _watched_layers.add(layer.id())
+    layer.dataChanged.connect(partial(_forget_layer, layer.id()))
+    layer.willBeDeleted.connect(partial(_delete_layer, layer.id()))
+
+def prepare_raster(layer, transform_context):
+    """
+    Make a raster layer available to sample_raster. Must be called in
+    the main thread, which owns the layer and its data provider.
+    """
+    _watch_layer(layer)
+    with _lock:
+        if layer.id() not in _sources:
+            _sources[layer.id()] = _RasterSource(layer.dataProvider().clone(), layer.bandCount(),
+                                                 transform_context)
+
+def raster_band_count(layer_id):
+    """
+    Return the number of bands of a prepared raster layer, or None when
+    the layer is not prepared.
+    """
+    source = _sources.get(layer_id)
+    return source.band_count if source is not None else None
+
+def sample_raster(layer_id, band, geohash):
+    """
+    Return the value of a band of a prepared raster layer at the center
+    of a geohash cell, through the value and block caches. Can be called
+    from any thread. Raises ValueError when the layer is not prepared.
+    """
+    key = (layer_id, band, geohash)
+    with _lock:
+        if key in _values:
+            _values.move_to_end(key)
+            return _values[key]
+        source = _sources.get(layer_id)
+    if source is None:
+        raise ValueError('the raster layer {} is not prepared'.format(layer_id))
+
+    # Each thread samples through its own provider clone and block cache
+    samplers = getattr(_threads, 'samplers', None)
+    if samplers is None:
+        samplers = _threads.samplers = {}
+    cached = samplers.get(key[:2])
+    if cached is None or cached[0] is not source:
+        cached = samplers[key[:2]] = (source, RasterBlockSampler(source.clone(), band, source.transform_context))
+    value = cached[1].sample_geohash(geohash)
+
+    with _lock:
+        if len(_values) >= MAX_VALUES:
+            _values.popitem(last=False)
+        _values[key] = value
+    return value
+
+def clear_raster_cache():
+    """
+    Forget the prepared rasters and the cached values. The samplers of
+    the other threads are dropped on their next call.
+    """
+    with _lock:
+        _sources.clear()
+        _values.clear()
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ SampleRasterAlgorithm
+                                 A QGIS plugin
+ This plugin adds four expression functions to work with geohash
+ Generated by Plugin Builder: http://g-sherman.github.io/Qgis-Plugin-Builder/
+                             -------------------
+        begin                : 2023-12-09
+        git sha              : $Format:%H$
+        copyright            : (C) 2023 by Valentin BUIRA
+        email                : valentin.buira at gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+from collections import OrderedDict
+
+from qgis.PyQt.QtCore import QCoreApplication, QVariant
+from qgis.core import (QgsCoordinateReferenceSystem,
+                       QgsCoordinateTransform,
+                       QgsField,
+                       QgsProcessingException,
+                       QgsProcessingFeatureBasedAlgorithm,
+                       QgsProcessingParameterBand,
+                       QgsProcessingParameterNumber,
+                       QgsProcessingParameterRasterLayer,
+                       QgsProcessingParameterString)
+
+from .geohash import encode
+from .raster_sampling import MAX_VALUES, RasterBlockSampler
+
+
+class SampleRasterAlgorithm(QgsProcessingFeatureBasedAlgorithm):
+    """
+    Add the value of a raster band at the center of the geohash cell of
+    each feature. Features in the same cell share one sample, and cells
+    of the same area share one block read of the raster.
+    """
+
+    RASTER = 'RASTER'
+    BAND = 'BAND'
+    PRECISION = 'PRECISION'
+    FIELD_NAME = 'FIELD_NAME'
+
+    field_name = 'sample'
+
+    def initParameters(self, config=None):
+        self.addParameter(
+            QgsProcessingParameterRasterLayer(
+                self.RASTER,
+                self.tr('Raster layer')
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterBand(
+                self.BAND,
+                self.tr('Band'),
+                defaultValue=1,
+                parentLayerParameterName=self.RASTER
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.PRECISION,
+                self.tr('Precision'),
+                QgsProcessingParameterNumber.Integer,
+                defaultValue=8,
+                minValue=1,
+                maxValue=12
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterString(
+                self.FIELD_NAME,
+                self.tr('Field name'),
+                defaultValue='sample'
+            )
+        )
+
+    def outputName(self):
+        return self.tr('Sampled')
+
+    def outputFields(self, input_fields):
+        input_fields.append(QgsField(self.field_name, QVariant.Double))
+        return input_fields
+
+    def prepareAlgorithm(self, parameters, context, feedback):
+        raster = self.parameterAsRasterLayer(parameters, self.RASTER, context)
+        band = self.parameterAsInt(parameters, self.BAND, context)
+        self.precision = self.parameterAsInt(parameters, self.PRECISION, context)
+        self.field_name = self.parameterAsString(parameters, self.FIELD_NAME, context)
+        try:
+            # The provider is cloned as the algorithm may run in another thread
+            self.sampler = RasterBlockSampler(raster.dataProvider().clone(), band, context.transformContext())
+        except ValueError as e:
+            raise QgsProcessingException(str(e))
+        self.values = OrderedDict()
+        source = self.parameterAsSource(parameters, 'INPUT', context)
+        self.transform = QgsCoordinateTransform(source.sourceCrs(),
+                                                QgsCoordinateReferenceSystem('EPSG:4326'),
+                                                context.transformContext())
+        return True
+
+    def processFeature(self, feature, context, feedback):
+        geometry = feature.geometry()
+        if geometry.isNull():
+            feature.setAttributes(feature.attributes() + [None])
+            return [feature]
+        point = self.transform.transform(geometry.centroid().asPoint())
+        geohash = encode(point.y(), point.x(), precision=self.precision)
+        if geohash in self.values:
+            self.values.move_to_end(geohash)
+            value = self.values[geohash]
+        else:
+            value = self.sampler.sample_geohash(geohash)
+            if len(self.values) >= MAX_VALUES:
+                self.values.popitem(last=False)
+            self.values[geohash] = value
+        feature.setAttributes(feature.attributes() + [value])
+        return [feature]
+
+    def name(self):
+        return 'sampleraster'
+
+    def displayName(self):
+        return self.tr('Sample raster by geohash cell')
+
+    def group(self):
+        return self.tr('Raster analysis')
+
+    def groupId(self):
+        return 'rasteranalysis'
+
+    def shortHelpString(self):
+        return self.tr('Adds a field with the value of a raster band at the center of the geohash '
+                       'cell, of the given precision, of the centroid of each feature. Each cell is '
+                       'sampled only once while it stays in a cache of the most recent cells, and the '
+                       'raster is read by blocks of 256 x 256 pixels so neighbouring cells share one '
+                       'read. Cells outside of the raster or on nodata pixels get a NULL value.')
+
+    def tr(self, string):
+        return QCoreApplication.translate('Processing', string)
+
+    def createInstance(self):
+        return SampleRasterAlgorithm()
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ SortByGeohashAlgorithm
+                                 A QGIS plugin
+ This plugin adds four expression functions to work with geohash
+ Generated by Plugin Builder: http://g-sherman.github.io/Qgis-Plugin-Builder/
+                             -------------------
+        begin                : 2023-12-09
+        git sha              : $Format:%H$
+        copyright            : (C) 2023 by Valentin BUIRA
+        email                : valentin.buira at gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import heapq
+import os
+import tempfile
+
+from qgis.PyQt.QtCore import QCoreApplication
+from qgis.core import (QgsCoordinateReferenceSystem,
+                       QgsCoordinateTransform,
+                       QgsFeatureRequest,
+                       QgsFeatureSink,
+                       QgsProcessingParameterFeatureSink,
+                       QgsProcessingParameterFeatureSource,
+                       QgsProcessingParameterFile,
+                       QgsProcessingParameterNumber,
+                       QgsProcessingAlgorithm)
+
+from .geohash import encode
+
+# Sort key of the features without geometry, after every geohash
+NO_GEOMETRY_KEY = '~'
+
+# Maximum number of runs merged at once, each one holds an open file
+MERGE_FAN_IN = 64
+
+
+def _write_run(run, temp_dir):
+    fd, path = tempfile.mkstemp(suffix='.run', dir=temp_dir)
+    with os.fdopen(fd, 'w') as f:
+        f.writelines('{} {}\n'.format(key, fid) for key, fid in run)
+    return path
+
+def _read_run(path):
+    with open(path) as f:
+        for line in f:
+            key, fid = line.split()
+            yield key, int(fid)
+
+def external_sort(keys, run_size, temp_dir, feedback=None):
+    """
+    Sort an iterable of (key, fid) with a disk backed merge sort: the
+    items are sorted in runs of at most run_size items written to
+    temp_dir, then the runs are merged by groups of at most
+    MERGE_FAN_IN runs until they can be merged lazily in a single pass.
+    Yields the sorted items.
+    """
+    paths = []
+    run = []
+    for item in keys:
+        run.append(item)
+        if len(run) >= run_size:
+            run.sort()
+            paths.append(_write_run(run, temp_dir))
+            run = []
+        if feedback is not None and feedback.isCanceled():
+            return
+    if run:
+        run.sort()
+        paths.append(_write_run(run, temp_dir))
+
+    while len(paths) > MERGE_FAN_IN:
+        merged = []
+        for i in range(0, len(paths), MERGE_FAN_IN):
+            group = paths[i:i + MERGE_FAN_IN]
+            merged.append(_write_run(heapq.merge(*[_read_run(path) for path in group]), temp_dir))
+            for path in group:
+                os.remove(path)
+            if feedback is not None and feedback.isCanceled():
+                return
+        paths = merged
+
+    yield from heapq.merge(*[_read_run(path) for path in paths])
+
+
+class SortByGeohashAlgorithm(QgsProcessingAlgorithm):
+    """
+    Write a copy of a layer with its features ordered by the geohash of
+    their centroid, so that features close in space are close in the
+    file. Works on layers that do not fit in memory: the sort keys are
+    sorted with an external merge sort and the features are then fetched
+    by chunks of ids in sorted order.
+    """
+
+    INPUT = 'INPUT'
+    PRECISION = 'PRECISION'
+    RUN_SIZE = 'RUN_SIZE'
+    TEMP_DIR = 'TEMP_DIR'
+    OUTPUT = 'OUTPUT'
+
+    FETCH_SIZE = 10000
+
+    def initAlgorithm(self, config):
+        self.addParameter(
+            QgsProcessingParameterFeatureSource(
+                self.INPUT,
+                self.tr('Input layer')
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.PRECISION,
+                self.tr('Precision'),
+                QgsProcessingParameterNumber.Integer,
+                defaultValue=12,
+                minValue=1,
+                maxValue=12
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.RUN_SIZE,
+                self.tr('Maximum sort keys in memory'),
+                QgsProcessingParameterNumber.Integer,
+                defaultValue=1000000,
+                minValue=1000
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterFile(
+                self.TEMP_DIR,
+                self.tr('Temporary directory'),
+                behavior=QgsProcessingParameterFile.Folder,
+                optional=True
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterFeatureSink(
+                self.OUTPUT,
+                self.tr('Sorted by geohash')
+            )
+        )
+
+    def processAlgorithm(self, parameters, context, feedback):
+        source = self.parameterAsSource(parameters, self.INPUT, context)
+        precision = self.parameterAsInt(parameters, self.PRECISION, context)
+        run_size = self.parameterAsInt(parameters, self.RUN_SIZE, context)
+        temp_dir = self.parameterAsFile(parameters, self.TEMP_DIR, context) or None
+
+        (sink, dest_id) = self.parameterAsSink(parameters, self.OUTPUT, context,
+                                               source.fields(), source.wkbType(), source.sourceCrs())
+
+        transform = QgsCoordinateTransform(source.sourceCrs(),
+                                           QgsCoordinateReferenceSystem('EPSG:4326'),
+                                           context.transformContext())
+        total = 100.0 / source.featureCount() if source.featureCount() else 0
+
+        def keys():
+            request = QgsFeatureRequest().setNoAttributes()
+            for current, feature in enumerate(source.getFeatures(request)):
+                geometry = feature.geometry()
+                if geometry.isNull():
+                    yield NO_GEOMETRY_KEY, feature.id()
+                else:
+                    point = transform.transform(geometry.centroid().asPoint())
+                    yield encode(point.y(), point.x(), precision=precision), feature.id()
+                feedback.setProgress(int(current * total / 2))
+
+        with tempfile.TemporaryDirectory(dir=temp_dir) as run_dir:
+            chunk = []
+            written = 0
+            for key, fid in external_sort(keys(), run_size, run_dir, feedback):
+                chunk.append(fid)
+                if len(chunk) >= self.FETCH_SIZE:
+                    written += self._write_chunk(source, sink, chunk)
+                    chunk = []
+                    feedback.setProgress(50 + int(written * total / 2))
+                if feedback.isCanceled():
+                    return {}
+            if feedback.isCanceled():
+                return {}
+            self._write_chunk(source, sink, chunk)
+
+        return {self.OUTPUT: dest_id}
+
+    def _write_chunk(self, source, sink, fids):
+        """
+        Fetch the features of a chunk of ids with a single request and
+        write them in the order of the ids.
+        """
+        if not fids:
+            return 0
+        features = {feature.id(): feature for feature in source.getFeatures(QgsFeatureRequest().setFilterFids(fids))}
+        sink.addFeatures([features[fid] for fid in fids if fid in features], QgsFeatureSink.FastInsert)
+        return len(fids)
+
+    def name(self):
+        return 'sortbygeohash'
+
+    def displayName(self):
+        return self.tr('Sort by geohash')
+
+    def group(self):
+        return self.tr('Vector general')
+
+    def groupId(self):
+        return 'vectorgeneral'
+
+    def shortHelpString(self):
+        return self.tr('Writes a copy of the layer with its features physically ordered by the '
+                       'geohash of their centroid, which improves the locality of extent based '
+                       'reads. The sort keys are sorted on disk in runs of at most the given '
+                       'number of keys, in the temporary directory, so the layer does not need to '
+                       'fit in memory. Features without geometry are written last.')
+
+    def tr(self, string):
+        return QCoreApplication.translate('Processing', string)
+
+    def createInstance(self):
+        return SortByGeohashAlgorithm()
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ SpaceTimeAggregateAlgorithm
+                                 A QGIS plugin
+ This plugin adds four expression functions to work with geohash
+ Generated by Plugin Builder: http://g-sherman.github.io/Qgis-Plugin-Builder/
+                             -------------------
+        begin                : 2023-12-09
+        git sha              : $Format:%H$
+        copyright            : (C) 2023 by Valentin BUIRA
+        email                : valentin.buira at gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+from qgis.PyQt.QtCore import QCoreApplication, QDateTime, Qt, QVariant
+from qgis.core import (NULL,
+                       QgsCoordinateReferenceSystem,
+                       QgsCoordinateTransform,
+                       QgsExpression,
+                       QgsFeature,
+                       QgsFeatureRequest,
+                       QgsFeatureSink,
+                       QgsField,
+                       QgsFields,
+                       QgsGeometry,
+                       QgsProcessing,
+                       QgsProcessingAlgorithm,
+                       QgsProcessingException,
+                       QgsProcessingParameterBoolean,
+                       QgsProcessingParameterFeatureSink,
+                       QgsProcessingParameterFeatureSource,
+                       QgsProcessingParameterField,
+                       QgsProcessingParameterNumber,
+                       QgsRectangle,
+                       QgsWkbTypes)
+
+from .geohash import encode, decode_extent
+from .qgis_expression import datetime_to_seconds
+from .time_key import time_key_for_window, time_window
+
+
+class SpaceTimeAggregateAlgorithm(QgsProcessingAlgorithm):
+    """
+    Aggregate events per geohash cell and time window in a single pass.
+
+    The events are streamed in provider order and only the open time
+    windows are kept in memory: when an event of a later window arrives,
+    the windows older than the allowed lateness are closed and their
+    cells written to the sink. Events arriving after their window was
+    closed are counted and skipped.
+    """
+
+    INPUT = 'INPUT'
+    DATETIME_FIELD = 'DATETIME_FIELD'
+    INTERVAL = 'INTERVAL'
+    PRECISION = 'PRECISION'
+    VALUE_FIELD = 'VALUE_FIELD'
+    LATENESS = 'LATENESS'
+    SORT = 'SORT'
+    OUTPUT = 'OUTPUT'
+
+    def initAlgorithm(self, config):
+        self.addParameter(
+            QgsProcessingParameterFeatureSource(
+                self.INPUT,
+                self.tr('Input layer'),
+                [QgsProcessing.TypeVectorAnyGeometry]
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterField(
+                self.DATETIME_FIELD,
+                self.tr('Date time field'),
+                parentLayerParameterName=self.INPUT,
+                type=QgsProcessingParameterField.DateTime
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.INTERVAL,
+                self.tr('Time window (seconds)'),
+                QgsProcessingParameterNumber.Double,
+                defaultValue=3600,
+                minValue=1
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.PRECISION,
+                self.tr('Precision'),
+                QgsProcessingParameterNumber.Integer,
+                defaultValue=6,
+                minValue=1,
+                maxValue=12
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterField(
+                self.VALUE_FIELD,
+                self.tr('Value field to aggregate'),
+                parentLayerParameterName=self.INPUT,
+                type=QgsProcessingParameterField.Numeric,
+                optional=True
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.LATENESS,
+                self.tr('Allowed lateness (time windows)'),
+                QgsProcessingParameterNumber.Integer,
+                defaultValue=1,
+                minValue=0
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterBoolean(
+                self.SORT,
+                self.tr('Sort the input by date time (the whole input is loaded in memory when '
+                        'the data provider cannot sort it)'),
+                defaultValue=False
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterFeatureSink(
+                self.OUTPUT,
+                self.tr('Space-time buckets')
+            )
+        )
+
+    def processAlgorithm(self, parameters, context, feedback):
+        source = self.parameterAsSource(parameters, self.INPUT, context)
+        datetime_field = self.parameterAsString(parameters, self.DATETIME_FIELD, context)
+        interval = self.parameterAsDouble(parameters, self.INTERVAL, context)
+        precision = self.parameterAsInt(parameters, self.PRECISION, context)
+        value_field = self.parameterAsString(parameters, self.VALUE_FIELD, context)
+        lateness = self.parameterAsInt(parameters, self.LATENESS, context)
+        sort = self.parameterAsBoolean(parameters, self.SORT, context)
+
+        # Fail before writing anything when the keys of the first or the
+        # last window of the data do not fit in 64 bits
+        datetime_index = source.fields().lookupField(datetime_field)
+        for timestamp in (source.minimumValue(datetime_index), source.maximumValue(datetime_index)):
+            if timestamp is None or timestamp == NULL:
+                continue
+            try:
+                time_key_for_window('z' * precision, time_window(datetime_to_seconds(timestamp), interval))
+            except ValueError as e:
+                raise QgsProcessingException(str(e))
+
+        fields = QgsFields()
+        fields.append(QgsField('time_key', QVariant.LongLong))
+        fields.append(QgsField('geohash', QVariant.String, len=precision))
+        fields.append(QgsField('window_start', QVariant.DateTime))
+        fields.append(QgsField('window_end', QVariant.DateTime))
+        fields.append(QgsField('count', QVariant.Int))
+        if value_field:
+            for name in ('sum', 'min', 'max', 'mean'):
+                fields.append(QgsField(name, QVariant.Double))
+
+        (sink, dest_id) = self.parameterAsSink(parameters, self.OUTPUT, context, fields,
+                                               QgsWkbTypes.Polygon,
+                                               QgsCoordinateReferenceSystem('EPSG:4326'))
+
+        transform = QgsCoordinateTransform(source.sourceCrs(),
+                                           QgsCoordinateReferenceSystem('EPSG:4326'),
+                                           context.transformContext())
+
+        # window -> {geohash: [count, sum, min, max, values count]}
+        open_windows = {}
+
+        def flush(window):
+            start = window * interval
+            for geohash, (count, value_sum, minimum, maximum, value_count) in sorted(open_windows.pop(window).items()):
+                try:
+                    key = time_key_for_window(geohash, window)
+                except ValueError as e:
+                    raise QgsProcessingException(str(e))
+                lat_min, lat_max, lon_min, lon_max = decode_extent(geohash)
+                feature = QgsFeature(fields)
+                feature.setGeometry(QgsGeometry.fromRect(QgsRectangle(lon_min, lat_min, lon_max, lat_max)))
+                attributes = [key, geohash,
+                              QDateTime.fromMSecsSinceEpoch(int(start * 1000), Qt.TimeSpec.UTC),
+                              QDateTime.fromMSecsSinceEpoch(int((start + interval) * 1000), Qt.TimeSpec.UTC),
+                              count]
+                if value_field:
+                    if value_count:
+                        attributes += [value_sum, minimum, maximum, value_sum / value_count]
+                    else:
+                        attributes += [None] * 4
+                feature.setAttributes(attributes)
+                sink.addFeature(feature, QgsFeatureSink.FastInsert)
+
+        latest = None
+        late = 0
+        skipped = 0
+        total = 100.0 / source.featureCount() if source.featureCount() else 0
+        # Events are streamed in provider order and only reordered within
+        # the lateness, unless the sort is asked for
+        request = QgsFeatureRequest()
+        if sort:
+            request.addOrderBy(QgsExpression.quotedColumnRef(datetime_field))
+        for current, feature in enumerate(source.getFeatures(request)):
+            if feedback.isCanceled():
+                return {}
+            feedback.setProgress(int(current * total))
+            geometry = feature.geometry()
+            timestamp = feature[datetime_field]
+            if geometry.isNull() or timestamp is None or timestamp == NULL:
+                skipped += 1
+                continue
+            try:
+                window = time_window(datetime_to_seconds(timestamp), interval)
+            except ValueError:
+                skipped += 1
+                continue
+
+            if latest is None or window > latest:
+                latest = window
+                for closed in sorted(w for w in open_windows if w < latest - lateness):
+                    flush(closed)
+            if window < latest - lateness:
+                late += 1
+                continue
+
+            point = transform.transform(geometry.centroid().asPoint())
+            cells = open_windows.setdefault(window, {})
+            geohash = encode(point.y(), point.x(), precision=precision)
+            stats = cells.get(geohash)
+            if stats is None:
+                stats = cells[geohash] = [0, 0.0, None, None, 0]
+            stats[0] += 1
+            if value_field:
+                value = feature[value_field]
+                if value is not None and value != NULL:
+                    value = float(value)
+                    stats[1] += value
+                    stats[2] = value if stats[2] is None else min(stats[2], value)
+                    stats[3] = value if stats[3] is None else max(stats[3], value)
+                    stats[4] += 1
+
+        for window in sorted(open_windows):
+            flush(window)
+
+        if skipped:
+            feedback.pushInfo(self.tr('{} events without geometry or date time were skipped').format(skipped))
+        if late:
+            feedback.reportError(self.tr('{} events arrived after their time window was closed and were '
+                                         'skipped, increase the allowed lateness or sort the input').format(late))
+        return {self.OUTPUT: dest_id}
+
+    def name(self):
+        return 'spacetimeaggregate'
+
+    def displayName(self):
+        return self.tr('Aggregate by space-time bucket')
+
+    def group(self):
+        return self.tr('Vector analysis')
+
+    def groupId(self):
+        return 'vectoranalysis'
+
+    def shortHelpString(self):
+        return self.tr('Counts the events, and aggregates an optional value field, per geohash cell '
+                       'of their centroid and time window, in a single streaming pass. Each bucket is '
+                       'written with its cell polygon and its space-time key, the sortable integer '
+                       'of the geohash_time_key expression function. The events are streamed in the '
+                       'order of the data provider and only the open time windows are kept in '
+                       'memory: the input is expected in date time order, and a window is closed '
+                       'and written as soon as an event more than the allowed lateness windows '
+                       'later arrives. Events of already closed windows are skipped and reported. '
+                       'The input can be sorted by date time instead, the data providers that '
+                       'cannot sort, like shapefiles, CSV or memory layers, then load the whole '
+                       'input in memory. Time windows are aligned on 1970-01-01 UTC.')
+
+    def tr(self, string):
+        return QCoreApplication.translate('Processing', string)
+
+    def createInstance(self):
+        return SpaceTimeAggregateAlgorithm()
@@ -0,0 +1,125 @@
+"""
+Geohash functions for SQLite connections.
+
+register_functions adds the functions below to a sqlite3 connection,
+for example on a GeoPackage, so grouping and filtering by geohash run
+inside the database engine. They are registered as deterministic so
+SQLite can factor out their calls and use them in indexes on
+expressions. Invalid or NULL arguments give NULL.
+
+    geohash_encode(lat, lon[, precision=12])  -> text
+    geohash_from_gpkg(geom[, precision=12])   -> text, from the point or
+                                                 the envelope center of
+                                                 a GeoPackage geometry
+                                                 in EPSG:4326
+    geohash_lat(geohash), geohash_lon(geohash) -> center of the cell
+    geohash_bbox(geohash)                     -> WKT polygon of the cell
+    geohash_parent(geohash, precision)        -> text
+    geohash_neighbours(geohash)               -> JSON array of text, to
+                                                 be used with json_each
+    geohash_to_int(geohash)                   -> integer
+"""
+import json
+import sqlite3
+import struct
+
+from .geohash import (encode, decode_extent, grid_position, grid_neighbours,
+                      from_grid_position, to_int)
+
+# Sizes of the envelope of a GeoPackage geometry by envelope indicator
+_envelope_sizes = {0: 0, 1: 32, 2: 48, 3: 48, 4: 64}
+
+
+def _null_on_error(function):
+    def wrapper(*args):
+        if any(arg is None for arg in args):
+            return None
+        try:
+            return function(*args)
+        except (KeyError, ValueError, TypeError, IndexError, struct.error):
+            return None
+    wrapper.__name__ = function.__name__
+    return wrapper
+
+def gpkg_center(blob):
+    """
+    Return the (x, y) of a GeoPackage geometry blob: the coordinates of
+    a point, or the center of the envelope of other geometries. Returns
+    None for empty geometries and geometries without envelope.
+    """
+    if blob[:2] != b'GP':
+        raise ValueError('not a GeoPackage geometry')
+    flags = blob[3]
+    if flags & 0x10:
+        return None
+    header_order = '<' if flags & 1 else '>'
+    envelope_size = _envelope_sizes[(flags >> 1) & 7]
+    if envelope_size:
+        x_min, x_max, y_min, y_max = struct.unpack_from(header_order + '4d', blob, 8)
+        return (x_min + x_max) / 2, (y_min + y_max) / 2
+
+    wkb = 8
+    order = '<' if blob[wkb] == 1 else '>'
+    geometry_type, = struct.unpack_from(order + 'I', blob, wkb + 1)
+    if geometry_type % 1000 != 1:
+        return None
+    return struct.unpack_from(order + '2d', blob, wkb + 5)
+
+def _encode(lat, lon, precision=12):
+    return encode(float(lat), float(lon), precision=int(precision))
+
+def _from_gpkg(blob, precision=12):
+    center = gpkg_center(bytes(blob))
+    if center is None:
+        return None
+    return encode(center[1], center[0], precision=int(precision))
+
+def _lat(geohash):
+    lat_min, lat_max, lon_min, lon_max = decode_extent(geohash)
+    return (lat_min + lat_max) / 2
+
+def _lon(geohash):
+    lat_min, lat_max, lon_min, lon_max = decode_extent(geohash)
+    return (lon_min + lon_max) / 2
+
+def _bbox(geohash):
+    lat_min, lat_max, lon_min, lon_max = decode_extent(geohash)
+    return 'POLYGON(({0} {2},{1} {2},{1} {3},{0} {3},{0} {2}))'.format(
+        repr(lon_min), repr(lon_max), repr(lat_min), repr(lat_max))
+
+def _parent(geohash, precision):
+    return geohash[:int(precision)]
+
+def _neighbours(geohash):
+    row, col = grid_position(geohash)
+    cells = [from_grid_position(r, c, len(geohash)) for r, c in grid_neighbours(row, col, len(geohash))]
+    return json.dumps(sorted(cells))
+
+def _to_int(geohash):
+    return to_int(geohash)
+
+# name -> (function, numbers of arguments)
+_functions = {
+    'geohash_encode': (_encode, (2, 3)),
+    'geohash_from_gpkg': (_from_gpkg, (1, 2)),
+    'geohash_lat': (_lat, (1,)),
+    'geohash_lon': (_lon, (1,)),
+    'geohash_bbox': (_bbox, (1,)),
+    'geohash_parent': (_parent, (2,)),
+    'geohash_neighbours': (_neighbours, (1,)),
+    'geohash_to_int': (_to_int, (1,)),
+}
+
+
+def register_functions(connection):
+    """
+    Register the geohash functions on a sqlite3 connection.
+    """
+    for name, (function, arg_counts) in _functions.items():
+        function = _null_on_error(function)
+        for arg_count in arg_counts:
+            try:
+                connection.create_function(name, arg_count, function, deterministic=True)
+            except (TypeError, sqlite3.NotSupportedError):
+                # Python < 3.8 or SQLite < 3.8.3
+                connection.create_function(name, arg_count, function)
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ ThinPointsAlgorithm
+                                 A QGIS plugin
+ This plugin adds four expression functions to work with geohash
+ Generated by Plugin Builder: http://g-sherman.github.io/Qgis-Plugin-Builder/
+                             -------------------
+        begin                : 2023-12-09
+        git sha              : $Format:%H$
+        copyright            : (C) 2023 by Valentin BUIRA
+        email                : valentin.buira at gmail.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+from qgis.PyQt.QtCore import QCoreApplication, QVariant
+from qgis.core import (QgsCoordinateReferenceSystem,
+                       QgsCoordinateTransform,
+                       QgsFeature,
+                       QgsFeatureSink,
+                       QgsField,
+                       QgsProcessing,
+                       QgsProcessingAlgorithm,
+                       QgsProcessingParameterFeatureSink,
+                       QgsProcessingParameterFeatureSource,
+                       QgsProcessingParameterNumber,
+                       QgsProcessingParameterScale)
+
+from .geohash import encode
+from .thinning import ReservoirThinner, precision_for_scale
+
+
+class ThinPointsAlgorithm(QgsProcessingAlgorithm):
+    """
+    Keep at most a given number of points per geohash cell, sampled with
+    reservoir sampling in a single pass over the layer.
+    """
+
+    INPUT = 'INPUT'
+    MAX_POINTS = 'MAX_POINTS'
+    PRECISION = 'PRECISION'
+    SCALE = 'SCALE'
+    OUTPUT = 'OUTPUT'
+
+    def initAlgorithm(self, config):
+        self.addParameter(
+            QgsProcessingParameterFeatureSource(
+                self.INPUT,
+                self.tr('Input layer'),
+                [QgsProcessing.TypeVectorPoint]
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.MAX_POINTS,
+                self.tr('Maximum points per cell'),
+                QgsProcessingParameterNumber.Integer,
+                defaultValue=1,
+                minValue=1
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.PRECISION,
+                self.tr('Precision'),
+                QgsProcessingParameterNumber.Integer,
+                defaultValue=6,
+                minValue=1,
+                maxValue=12
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterScale(
+                self.SCALE,
+                self.tr('Map scale (picks the precision when set)'),
+                optional=True
+            )
+        )
+
+        self.addParameter(
+            QgsProcessingParameterFeatureSink(
+                self.OUTPUT,
+                self.tr('Thinned points')
+            )
+        )
+
+    def processAlgorithm(self, parameters, context, feedback):
+        source = self.parameterAsSource(parameters, self.INPUT, context)
+        max_points = self.parameterAsInt(parameters, self.MAX_POINTS, context)
+        precision = self.parameterAsInt(parameters, self.PRECISION, context)
+        if parameters.get(self.SCALE):
+            precision = precision_for_scale(self.parameterAsDouble(parameters, self.SCALE, context))
+            feedback.pushInfo(self.tr('Precision {} for the map scale').format(precision))
+
+        fields = source.fields()
+        fields.append(QgsField('geohash', QVariant.String, len=precision))
+        fields.append(QgsField('dropped_count', QVariant.Int))
+        (sink, dest_id) = self.parameterAsSink(parameters, self.OUTPUT, context, fields,
+                                               source.wkbType(), source.sourceCrs())
+
+        transform = QgsCoordinateTransform(source.sourceCrs(),
+                                           QgsCoordinateReferenceSystem('EPSG:4326'),
+                                           context.transformContext())
+        thinner = ReservoirThinner(max_points)
+        total = 100.0 / source.featureCount() if source.featureCount() else 0
+        for current, feature in enumerate(source.getFeatures()):
+            if feedback.isCanceled():
+                return {}
+            geometry = feature.geometry()
+            if geometry.isNull():
+                continue
+            point = transform.transform(geometry.centroid().asPoint())
+            thinner.add(encode(point.y(), point.x(), precision=precision), feature)
+            feedback.setProgress(int(current * total))
+
+        for cell, kept, dropped in thinner.cells():
+            for feature in kept:
+                output = QgsFeature(fields)
+                output.setGeometry(feature.geometry())
+                output.setAttributes(feature.attributes() + [cell, dropped])
+                sink.addFeature(output, QgsFeatureSink.FastInsert)
+
+        return {self.OUTPUT: dest_id}
+
+    def name(self):
+        return 'thinpoints'
+
+    def displayName(self):
+        return self.tr('Thin points by geohash cell')
+
+    def group(self):
+        return self.tr('Vector selection')
+
+    def groupId(self):
+        return 'vectorselection'
+
+    def shortHelpString(self):
+        return self.tr('Keeps at most the given number of points per geohash cell, a uniform random '
+                       'sample of the points of the cell drawn with reservoir sampling in a single '
+                       'pass over the layer. The precision of the cells can be picked from a map '
+                       'scale, for cells of about 16 pixels. The kept points get the geohash of '
+                       'their cell and the number of points dropped in it. Points without geometry '
+                       'are dropped. For display, the geohash_thin expression function thins a '
+                       'layer in a rule based renderer and caches the result per precision.')
+
+    def tr(self, string):
+        return QCoreApplication.translate('Processing', string)
+
+    def createInstance(self):
+        return ThinPointsAlgorithm()
@@ -0,0 +1,87 @@
+"""
+Density aware thinning of points by geohash cell.
+
+Each cell keeps at most a given number of its points, a uniform random
+sample drawn with reservoir sampling, so the points are thinned in a
+single pass whatever their order and only the kept points are held in
+memory. The random generator is seeded, a same layer is always thinned
+the same way.
+"""
+import random
+
+from .cell_metrics import precision_for_distance
+
+# Size in meters of a screen pixel at the scale 1:1, at 96 dpi
+_pixel_size = 0.0254 / 96
+
+
+def precision_for_scale(scale, pixels=16, latitude=0.0):
+    """
+    Return the finest precision whose cells are at least the given
+    number of pixels wide and high on a map at the scale 1:scale.
+    """
+    return precision_for_distance(scale * _pixel_size * pixels, latitude)
+
+
+class ReservoirThinner:
+    """
+    Keep at most capacity items per cell, sampled uniformly among the
+    items added to the cell.
+    """
+
+    def __init__(self, capacity, seed=0):
+        if capacity < 1:
+            raise ValueError('at least one item must be kept per cell')
+        self.capacity = capacity
+        self._random = random.Random(seed)
+        # cell -> [number of items seen, kept items]
+        self._reservoirs = {}
+
+    def add(self, cell, item):
+        """
+        Add an item to a cell. Returns the item dropped from the cell, the
+        new one or a previously kept one, or None when none was dropped.
+        """
+        reservoir = self._reservoirs.get(cell)
+        if reservoir is None:
+            self._reservoirs[cell] = [1, [item]]
+            return None
+        reservoir[0] += 1
+        kept = reservoir[1]
+        if len(kept) < self.capacity:
+            kept.append(item)
+            return None
+        i = self._random.randrange(reservoir[0])
+        if i < self.capacity:
+            kept[i], item = item, kept[i]
+        return item
+
+    def cells(self):
+        """
+        Yield the (cell, kept items, number of dropped items) of every
+        cell, in geohash order.
+        """
+        for cell in sorted(self._reservoirs):
+            seen, kept = self._reservoirs[cell]
+            yield cell, kept, seen - len(kept)
+
+
+class ThinnedIds:
+    """
+    The ids kept by a thinning, stored as the kept ids or as the dropped
+    ids, whichever are fewer, so thinning at precisions where most cells
+    hold less than the capacity costs little memory.
+    """
+
+    def __init__(self, kept, dropped):
+        self.complement = len(dropped) < len(kept)
+        self._ids = frozenset(dropped if self.complement else kept)
+
+    def __contains__(self, item):
+        return (item in self._ids) != self.complement
+
+    def __len__(self):
+        """
+        Return the number of ids held in memory.
+        """
+        return len(self._ids)
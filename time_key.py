@@ -0,0 +1,53 @@
+"""
+Composite space-time bucket keys.
+
+A key packs the index of a time window, counted in intervals from the
+Unix epoch, above the 5 * precision bits of a geohash (see
+geohash.to_int):
+
+    key = window << (5 * precision) | to_int(geohash)
+
+Keys of a same precision and interval sort by time window then by
+geohash, so the events of a window and of nearby cells are contiguous.
+Keys must fit the 64 bits signed integers of QGIS expressions and data
+providers, which leaves 63 - 5 * precision bits for the window: with an
+interval of one minute, up to precision 7.
+"""
+from .geohash import to_int, from_int
+
+_max_key = (1 << 63) - 1
+
+
+def time_window(timestamp, interval):
+    """
+    Return the index of the time window of a timestamp in seconds since
+    the Unix epoch, for an interval in seconds.
+    """
+    return int(timestamp // interval)
+
+def time_key(geohash, timestamp, interval):
+    """
+    Return the space-time key of a geohash and a timestamp in seconds
+    since the Unix epoch, for an interval in seconds. Raises ValueError
+    when the key does not fit in a 64 bits signed integer.
+    """
+    return time_key_for_window(geohash, time_window(timestamp, interval))
+
+def time_key_for_window(geohash, window):
+    """
+    Return the space-time key of a geohash and the index of a time
+    window. Raises ValueError when the key does not fit in a 64 bits
+    signed integer.
+    """
+    key = (window << (5 * len(geohash))) | to_int(geohash)
+    if window < 0 or key > _max_key:
+        raise ValueError('the time window does not fit in the key, use a longer interval or a lower precision')
+    return key
+
+def split_time_key(key, precision, interval):
+    """
+    Return the geohash and the start of the time window, in seconds since
+    the Unix epoch, of a space-time key.
+    """
+    bits = 5 * precision
+    return from_int(key & ((1 << bits) - 1), precision), (key >> bits) * interval